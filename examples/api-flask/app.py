@@ -1,13 +1,37 @@
+import os
+
 from flask import Flask, render_template, request
 import pandas as pd
 from sklearn.linear_model import LinearRegression
 
+import datacache
+
 app = Flask(__name__)
-df = pd.read_csv(
+df = datacache.read_csv(
     "https://saturn-public-data.s3.us-east-2.amazonaws.com/examples/dashboard/housePriceData.csv"
 )
 linear_regression = LinearRegression().fit(df[["BedroomAbvGr", "YearBuilt"]], df["SalePrice"])
 
+# The inputs are validated to a small closed domain, so every valid prediction can be
+# computed once at startup. A request then becomes an array lookup with no DataFrame.
+# Set PRECOMPUTE_PREDICTIONS=0 to always call the model instead.
+BEDROOMS = range(0, 9)
+YEARS = range(1872, 2101)
+price_table = None
+if os.getenv("PRECOMPUTE_PREDICTIONS", "1") == "1":
+    grid = pd.DataFrame(
+        [(b, y) for b in BEDROOMS for y in YEARS], columns=["BedroomAbvGr", "YearBuilt"]
+    )
+    price_table = linear_regression.predict(grid).reshape(len(BEDROOMS), len(YEARS))
+
+
+def predict_price(bedrooms, year_built):
+    """Looks the price up in the precomputed table, falling back to the model outside it."""
+    if price_table is not None and bedrooms in BEDROOMS and year_built in YEARS:
+        return price_table[bedrooms - BEDROOMS.start, year_built - YEARS.start]
+    input = pd.DataFrame([[bedrooms, year_built]], columns=["BedroomAbvGr", "YearBuilt"])
+    return linear_regression.predict(input)[0]
+
 
 @app.route("/")
 def index():
@@ -25,7 +49,6 @@ def predict():
             data="Invalid entry. Please enter a number of bedrooms between 1 and 8 and a year built between 1872 and 2100.",
         )
 
-    input = pd.DataFrame([[bedrooms, year_built]], columns=["BedroomAbvGr", "YearBuilt"])
-    prediction = linear_regression.predict(input)
+    prediction = predict_price(bedrooms, year_built)
 
     return render_template("index.html", data=f"The house price is: ${int(prediction)}.")
@@ -0,0 +1,33 @@
+import time
+
+import pandas as pd
+
+from houseprice import BEDROOMS, YEARS, lr, predict_price, price_table
+
+N_REQUESTS = 20000
+
+
+def model_path(bedrooms, year_built):
+    # What /predict did before the table: one DataFrame and one model call per request
+    a = pd.DataFrame([[bedrooms, year_built]], columns=["BedroomAbvGr", "YearBuilt"])
+    return lr.predict(a)[0]
+
+
+inputs = [(b, y) for b in BEDROOMS for y in YEARS]
+inputs = (inputs * (N_REQUESTS // len(inputs) + 1))[:N_REQUESTS]
+
+# Both paths must give the same answer for every valid input
+for b, y in inputs[: len(BEDROOMS) * len(YEARS)]:
+    assert abs(model_path(b, y) - predict_price(b, y)) < 1e-6
+
+if price_table is None:
+    print("Precomputed table disabled (PRECOMPUTE_PREDICTIONS=0): predict_price calls the model")
+else:
+    print(f"Table size: {price_table.size} predictions, {price_table.nbytes / 1024:.1f} KiB")
+lookup = "predict_price" if price_table is None else "table lookup"
+for name, fn in [("model.predict", model_path), (lookup, predict_price)]:
+    start = time.perf_counter()
+    for b, y in inputs:
+        fn(b, y)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<14} {elapsed / N_REQUESTS * 1e6:>10.2f} us/request")
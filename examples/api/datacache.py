@@ -0,0 +1,254 @@
+"""
+Local cache for the public datasets the examples load from S3.
+
+The first call to `read_csv(url)` downloads the file once into a
+content-addressed cache (files are named by their SHA-256), verifies the
+checksum and converts it to an uncompressed Arrow IPC file. Later calls
+memory-map the Arrow file instead of touching the network or re-parsing CSV.
+
+Checksums:
+
+* The expected SHA-256 of each URL is pinned in ``checksums.json`` next to
+  this file. A download that doesn't match its pin is rejected. A URL with no
+  pin (``null``) is trusted on first download; the digest recorded then is
+  what later downloads of the same URL must match.
+* Before a process first uses a cached blob, it re-hashes the blob against
+  its content-address name. A truncated or corrupted blob is deleted together
+  with its Arrow copy and downloaded again (or reported, when offline).
+
+Environment variables:
+
+* ``DATASET_CACHE_DIR``: where to keep the cache (default ``~/.cache/saturn-datasets``)
+* ``DATASET_CACHE_OFFLINE=1``: never use the network; fail if a dataset is not cached
+* ``DATASET_CACHE_BYPASS=1``: call ``pd.read_csv(url)`` directly, as before the cache
+
+Prime the cache ahead of time (for example when building an image for an
+air-gapped cluster) and time cold versus warm loads with:
+
+    python datacache.py URL [URL ...]
+
+Record the current digests of URLs in checksums.json with:
+
+    python datacache.py --pin URL [URL ...]
+
+Measure the cold start of an app (a fresh interpreter running STATEMENT)
+without the cache, with an empty cache and with a warm cache:
+
+    python datacache.py --cold-start "import houseprice"
+"""
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv  # noqa: F401
+except ImportError:
+    pa = None
+
+CACHE_DIR = os.path.expanduser(os.getenv("DATASET_CACHE_DIR", "~/.cache/saturn-datasets"))
+OFFLINE = os.getenv("DATASET_CACHE_OFFLINE", "0") == "1"
+BYPASS = os.getenv("DATASET_CACHE_BYPASS", "0") == "1"
+CHECKSUMS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "checksums.json")
+CHUNK_SIZE = 1 << 20
+COLD_START_RUNS = 3
+
+_verified = set()  # blobs re-hashed by this process
+
+
+def _path(*parts):
+    path = os.path.join(CACHE_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def _ref_path(url):
+    # Refs map a URL to the hash of the content it pointed to when downloaded
+    return _path("refs", hashlib.sha256(url.encode()).hexdigest() + ".json")
+
+
+def _arrow_path(content_hash):
+    # The blob is content-addressed, so its Arrow conversion can be named by the same hash
+    return _path("arrow", content_hash + ".arrow")
+
+
+def _read_checksums():
+    if not os.path.exists(CHECKSUMS_FILE):
+        return {}
+    with open(CHECKSUMS_FILE) as f:
+        return json.load(f)
+
+
+def _recorded_hash(url):
+    if not os.path.exists(_ref_path(url)):
+        return None
+    with open(_ref_path(url)) as f:
+        return json.load(f)["sha256"]
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _discard(content_hash):
+    for path in (_path("blobs", content_hash), _arrow_path(content_hash)):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _download(url, sha256=None):
+    """Streams url into the blob store and returns the content hash."""
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=_path("blobs", ""))
+    try:
+        with os.fdopen(fd, "wb") as tmp, urllib.request.urlopen(url) as response:
+            while True:
+                chunk = response.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                tmp.write(chunk)
+
+        content_hash = digest.hexdigest()
+        if sha256 is not None and content_hash != sha256:
+            raise ValueError(
+                f"Checksum mismatch for {url}: expected {sha256}, downloaded {content_hash}. "
+                "If the dataset changed on purpose, run 'python datacache.py --pin URL'."
+            )
+        os.replace(tmp_path, _path("blobs", content_hash))
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    with open(_ref_path(url), "w") as f:
+        json.dump({"url": url, "sha256": content_hash}, f)
+    _verified.add(content_hash)
+    return content_hash
+
+
+def fetch(url, sha256=None):
+    """Returns the local path of the verified file, downloading it if needed.
+
+    sha256 overrides the digest pinned for url in checksums.json.
+    """
+    recorded = _recorded_hash(url)
+    expected = sha256 or _read_checksums().get(url) or recorded
+    content_hash = recorded if recorded == expected else None
+
+    if content_hash is not None and content_hash not in _verified:
+        blob_path = _path("blobs", content_hash)
+        if os.path.exists(blob_path) and _file_hash(blob_path) != content_hash:
+            print(f"⚠️ Cached copy of {url} is corrupted; discarding it")
+            _discard(content_hash)
+        elif os.path.exists(blob_path):
+            _verified.add(content_hash)
+
+    if content_hash is None or not os.path.exists(_path("blobs", content_hash)):
+        if OFFLINE:
+            raise FileNotFoundError(
+                f"{url} is not in the dataset cache ({CACHE_DIR}) and DATASET_CACHE_OFFLINE=1. "
+                "Run 'python datacache.py URL' with network access to prime the cache."
+            )
+        content_hash = _download(url, expected)
+    return _path("blobs", content_hash)
+
+
+def read_csv(url, sha256=None):
+    """Drop-in replacement for pd.read_csv(url) backed by the local cache."""
+    if BYPASS:
+        return pd.read_csv(url)
+    blob_path = fetch(url, sha256)
+    if pa is None:
+        return pd.read_csv(blob_path)
+
+    arrow_path = _arrow_path(os.path.basename(blob_path))
+    if not os.path.exists(arrow_path):
+        table = pa.csv.read_csv(blob_path)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(arrow_path))
+        with os.fdopen(fd, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp_path, arrow_path)
+
+    with pa.memory_map(arrow_path) as source:
+        return pa.ipc.open_file(source).read_all().to_pandas()
+
+
+def pin(urls):
+    """Downloads urls and records their current digests in checksums.json."""
+    checksums = _read_checksums()
+    for url in urls:
+        # Downloads afresh: the point is to pin what the URL serves now
+        content_hash = _download(url)
+        checksums[url] = content_hash
+        print(f"{content_hash}  {url}")
+    with open(CHECKSUMS_FILE, "w") as f:
+        json.dump(checksums, f, indent=2)
+        f.write("\n")
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def _run_app(statement, **env):
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-c", statement],
+        check=True,
+        cwd=os.path.dirname(CHECKSUMS_FILE),
+        env={**os.environ, **env},
+    )
+    return time.perf_counter() - start
+
+
+def cold_start(statement, runs=COLD_START_RUNS):
+    """Seconds from interpreter start until statement returns, without and with the cache."""
+    results = {"no cache (pd.read_csv from S3)": [], "empty cache": [], "warm cache": []}
+    for _ in range(runs):
+        results["no cache (pd.read_csv from S3)"].append(
+            _run_app(statement, DATASET_CACHE_BYPASS="1")
+        )
+        with tempfile.TemporaryDirectory() as cache_dir:
+            results["empty cache"].append(_run_app(statement, DATASET_CACHE_DIR=cache_dir))
+            results["warm cache"].append(_run_app(statement, DATASET_CACHE_DIR=cache_dir))
+
+    print(f"\nCold start of `{statement}` (median of {runs} fresh interpreters)")
+    for name, seconds in results.items():
+        print(f"  {name:<32} {sorted(seconds)[len(seconds) // 2]:>7.2f}s")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if not args:
+        print(__doc__)
+        sys.exit(1)
+    if args[0] == "--cold-start":
+        cold_start(" ".join(args[1:]))
+        sys.exit(0)
+    if args[0] == "--pin":
+        pin(args[1:])
+        sys.exit(0)
+
+    print(f"Cache directory: {CACHE_DIR}")
+    for url in args:
+        network = None if OFFLINE else _timed(pd.read_csv, url)
+        first = _timed(read_csv, url)
+        warm = _timed(read_csv, url)
+        print(f"\n{url}")
+        if network is not None:
+            print(f"  pd.read_csv over the network: {network:.3f}s")
+        print(f"  first cached load:            {first:.3f}s")
+        print(f"  warm load (memory-mapped):    {warm:.3f}s")
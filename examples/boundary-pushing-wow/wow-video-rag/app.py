@@ -1,8 +1,6 @@
 import os
-import cv2
 import torch
 import numpy as np
-import faiss
 import logging
 import streamlit as st
 from transformers import (
@@ -16,11 +14,16 @@ from transformers import (
 from PIL import Image
 from typing import List, Any
 
+from frame_index import embed_text, load_or_build_index, search
+from frames import frame_cache_dir, load_frames, video_hash
+from library import LIBRARY_DIR, Library
+
 # --- Configuration ---
 VIDEO_DIR = "data"
 VIDEO_FILENAME = "input_video.mp4" 
 VIDEO_PATH = os.path.join(VIDEO_DIR, VIDEO_FILENAME)
 FRAME_RATE_SEC = 5 
+TOP_K = int(os.getenv("TOP_K", "3"))  # frames retrieved and shown to the VLM per question
 VLM_MODEL_ID = "llava-hf/llava-v1.6-mistral-7b-hf" 
 CLIP_MODEL_ID = "openai/clip-vit-base-patch32"
 
@@ -50,71 +53,41 @@ def load_vlm_components():
     return clip_processor, clip_model, vlm_tokenizer, vlm_model, vlm_processor, device
 
 # --- STAGE 1: Frame Extraction ---
-@st.cache_data
-def extract_frames(video_path: str, rate_sec: int) -> List[np.ndarray]:
-    video = cv2.VideoCapture(video_path)
-    fps = video.get(cv2.CAP_PROP_FPS)
-    frame_interval = int(fps * rate_sec)
-    frames = []
-    frame_count = 0
-    while True:
-        ret, frame = video.read()
-        if not ret: break
-        if frame_count % frame_interval == 0:
-            frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-        frame_count += 1
-    video.release()
-    return frames
+@st.cache_resource
+def extract_frames(video_path: str, rate_sec: int):
+    # Sampled frames live in a disk-backed memmap (see frames.py); cache_resource
+    # keeps the handle instead of pickling and hashing the pixels
+    return load_frames(video_path, rate_sec)
 
 # --- STAGE 2: Multimodal Embedding Generation ---
-@st.cache_data
+@st.cache_resource
 # FIX 1: Leading underscores added to prevent Hashing Errors
-def generate_embeddings(frames: List[np.ndarray], _clip_processor, _clip_model, device: str):
-    frame_embeddings = []
-    for frame in frames:
-        inputs = _clip_processor(images=[frame], return_tensors="pt").to(device)
-        with torch.no_grad():
-            image_features = _clip_model.get_image_features(**inputs)
-            embedding = image_features / image_features.norm(p=2, dim=-1, keepdim=True)
-            frame_embeddings.append(embedding.cpu().numpy().flatten())
-            
-    embeddings_matrix = np.stack(frame_embeddings).astype('float32')
-    dimension = embeddings_matrix.shape[1]
-    index = faiss.IndexFlatL2(dimension)
-    index.add(embeddings_matrix)
-    return index, embeddings_matrix
+# The video key stands in for the frames, which would be slow to hash
+def generate_embeddings(video_key: str, _frames: np.ndarray, _cache_dir: str, _clip_processor, _clip_model, device: str):
+    # Embeds in batches and saves the index beside the frames; a reopened video just loads it
+    return load_or_build_index(_cache_dir, _frames, _clip_processor, _clip_model, CLIP_MODEL_ID, device)
+
+@st.cache_resource
+def load_library(shard_count: int):
+    # Keyed by the shard count, so newly ingested videos are picked up on the next rerun
+    return Library.load(LIBRARY_DIR)
 
 # --- STAGE 3: Retrieval-Augmented Q&A (RAG) ---
-def answer_question(
-    question: str, 
-    faiss_index: Any, 
-    frames: List[np.ndarray], 
-    clip_processor: CLIPProcessor, 
-    clip_model: CLIPModel,
-    vlm_tokenizer: AutoTokenizer, 
+def ask_vlm(
+    question: str,
+    images: List[Image.Image],
+    labels: List[str],
+    vlm_tokenizer: AutoTokenizer,
     vlm_model: Any,
     vlm_processor: Any,
     device: str
-) -> tuple:
-    # 3.1 Retrieval
-    text_inputs = clip_processor(text=[question], return_tensors="pt", padding=True).to(device)
-    with torch.no_grad():
-        text_features = clip_model.get_text_features(**text_inputs)
-        query_embedding = (text_features / text_features.norm(p=2, dim=-1, keepdim=True)).cpu().numpy().astype('float32')
-    
-    # 3.2 Search
-    distances, indices = faiss_index.search(query_embedding, 1)
-    best_frame_index = indices[0][0]
-    best_similarity = 1 / (1 + distances[0][0])
-    
-    # 3.3 Generation
-    best_frame_image = Image.fromarray(frames[best_frame_index])
-    
-    # Correct LLaVA-1.6 Prompt Format
-    prompt = f"[INST] <image>\n{question} [/INST]"
+) -> str:
+    # Correct LLaVA-1.6 Prompt Format, one <image> token per frame
+    image_tokens = "<image>\n" * len(images)
+    prompt = f"[INST] {image_tokens}These frames are from {', '.join(labels)}. {question} [/INST]"
     
     # FIX 2: Use the integrated vlm_processor to handle image + text
-    inputs = vlm_processor(text=prompt, images=best_frame_image, return_tensors="pt").to(device)
+    inputs = vlm_processor(text=prompt, images=images, return_tensors="pt").to(device)
     
     with torch.no_grad():
         output_ids = vlm_model.generate(**inputs, max_new_tokens=128)
@@ -124,11 +97,79 @@ def answer_question(
     
     # Extract only the assistant response
     if "[/INST]" in full_text:
-        final_answer = full_text.split("[/INST]")[-1].strip()
-    else:
-        final_answer = full_text
+        return full_text.split("[/INST]")[-1].strip()
+    return full_text
 
-    return final_answer, best_frame_index, best_similarity
+def answer_question(
+    question: str, 
+    faiss_index: Any, 
+    frames: np.ndarray, 
+    timestamps: List[float],
+    clip_processor: CLIPProcessor, 
+    clip_model: CLIPModel,
+    vlm_tokenizer: AutoTokenizer, 
+    vlm_model: Any,
+    vlm_processor: Any,
+    device: str,
+    top_k: int = TOP_K,
+) -> tuple:
+    # 3.1 Retrieval
+    query_embedding = embed_text(question, clip_processor, clip_model, device)
+    
+    # 3.2 Search: cosine similarity of the top-k frames, best first
+    hits = search(faiss_index, query_embedding, top_k)
+    
+    # 3.3 Generation: all retrieved frames in one call, in the order they appear in the video
+    ordered = sorted(hits, key=lambda hit: timestamps[hit[0]])
+    images = [Image.fromarray(np.asarray(frames[i])) for i, _ in ordered]
+    labels = [f"the video at {timestamps[i]:.0f}s" for i, _ in ordered]
+    return ask_vlm(question, images, labels, vlm_tokenizer, vlm_model, vlm_processor, device), hits
+
+def answer_library_question(
+    question: str,
+    library: Library,
+    clip_processor: CLIPProcessor,
+    clip_model: CLIPModel,
+    vlm_tokenizer: AutoTokenizer,
+    vlm_model: Any,
+    vlm_processor: Any,
+    device: str,
+    top_k: int = TOP_K,
+) -> tuple:
+    # One search over every shard of the library
+    query_embedding = embed_text(question, clip_processor, clip_model, device)
+    hits = library.search(query_embedding, top_k)
+    images = [Image.fromarray(hit["frame"]) for hit in hits]
+    labels = [f"{os.path.basename(hit['video']['path'])} at {hit['timestamp']:.0f}s" for hit in hits]
+    return ask_vlm(question, images, labels, vlm_tokenizer, vlm_model, vlm_processor, device), hits
+
+def library_dashboard(clip_p, clip_m, vlm_t, vlm_m, vlm_p, dev):
+    library = load_library(Library(LIBRARY_DIR).shard_count)
+    if library.model_id != CLIP_MODEL_ID:
+        st.error(f"The library was embedded with {library.model_id}, not {CLIP_MODEL_ID}.")
+        return
+    hours = sum(v["duration"] for v in library.videos.values()) / 3600
+    st.caption(f"{len(library.videos)} videos · {hours:.1f} hours · {len(library)} frames")
+
+    question = st.text_input("Ask about the library:", value="Where does someone give a presentation?")
+    if st.button("Search & Analyze", type="primary"):
+        with st.spinner("VLM is thinking..."):
+            try:
+                ans, hits = answer_library_question(
+                    question, library, clip_p, clip_m, vlm_t, vlm_m, vlm_p, dev
+                )
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.subheader("Answer")
+                    st.write(ans)
+                    st.metric("Best Similarity", f"{hits[0]['similarity']:.4f}")
+                with col2:
+                    st.subheader("Reference Frames")
+                    for hit in hits:
+                        name = os.path.basename(hit["video"]["path"])
+                        st.image(hit["frame"], caption=f"{name} · {hit['timestamp']:.0f}s · similarity {hit['similarity']:.3f}")
+            except Exception as e:
+                st.error(f"RAG Error: {e}")
 
 # --- STREAMLIT DASHBOARD INTERFACE ---
 def main_dashboard():
@@ -142,15 +183,24 @@ def main_dashboard():
         st.error(f"Resource Load Error: {e}")
         return
 
+    # Libraries are built with `python ingest_library.py <dir>`
+    sources = ["Single video"] + (["Video library"] if Library(LIBRARY_DIR).shard_count else [])
+    if st.sidebar.radio("Search", sources) == "Video library":
+        library_dashboard(clip_p, clip_m, vlm_t, vlm_m, vlm_p, dev)
+        return
+
     if not os.path.exists(VIDEO_PATH):
         st.warning("Video file not found in /data.")
         return
 
-    frames = extract_frames(VIDEO_PATH, FRAME_RATE_SEC)
+    with st.spinner("Sampling Frames..."):
+        frames, timestamps = extract_frames(VIDEO_PATH, FRAME_RATE_SEC)
     
     with st.spinner("Indexing Frames..."):
         # Calling with underscores
-        faiss_index, _ = generate_embeddings(frames, _clip_processor=clip_p, _clip_model=clip_m, device=dev)
+        video_key = f"{video_hash(VIDEO_PATH)}_{FRAME_RATE_SEC}"
+        cache_dir = frame_cache_dir(VIDEO_PATH, FRAME_RATE_SEC)
+        faiss_index = generate_embeddings(video_key, _frames=frames, _cache_dir=cache_dir, _clip_processor=clip_p, _clip_model=clip_m, device=dev)
 
     st.markdown("---")
     question = st.text_input("Ask about the video:", value="What is happening in this video?")
@@ -158,18 +208,19 @@ def main_dashboard():
     if st.button("Analyze", type="primary"):
         with st.spinner("VLM is thinking..."):
             try:
-                ans, idx, sim = answer_question(
-                    question, faiss_index, frames, clip_p, clip_m, vlm_t, vlm_m, vlm_p, dev
+                ans, hits = answer_question(
+                    question, faiss_index, frames, timestamps, clip_p, clip_m, vlm_t, vlm_m, vlm_p, dev
                 )
                 
                 col1, col2 = st.columns(2)
                 with col1:
                     st.subheader("Answer")
                     st.write(ans)
-                    st.metric("Similarity", f"{sim:.4f}")
+                    st.metric("Best Similarity", f"{hits[0][1]:.4f}")
                 with col2:
-                    st.subheader("Reference Frame")
-                    st.image(frames[idx])
+                    st.subheader("Reference Frames")
+                    for idx, sim in hits:
+                        st.image(np.asarray(frames[idx]), caption=f"{timestamps[idx]:.0f}s into the video · similarity {sim:.3f}")
             except Exception as e:
                 st.error(f"RAG Error: {e}")
 
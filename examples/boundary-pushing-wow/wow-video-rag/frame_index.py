@@ -0,0 +1,88 @@
+"""
+CLIP embeddings and the FAISS index over a video's sampled frames.
+
+Frames are embedded in batches of EMBED_BATCH. The vectors are
+L2-normalized, so inner product equals cosine similarity, and the index
+returns similarities in [-1, 1] directly. INDEX_TYPE picks the index:
+
+* ``flat``: exact search (IndexFlatIP)
+* ``hnsw``: approximate graph search, for videos with very many frames
+
+The index is written next to the video's frame memmap (see frames.py), so
+reopening an indexed video is a single file load.
+"""
+import os
+
+import faiss
+import numpy as np
+import torch
+
+EMBED_BATCH = int(os.getenv("EMBED_BATCH", "64"))
+INDEX_TYPE = os.getenv("INDEX_TYPE", "flat").lower()
+HNSW_M = 32
+HNSW_EF_SEARCH = 64
+
+
+def _normalize(features: torch.Tensor) -> np.ndarray:
+    features = features / features.norm(p=2, dim=-1, keepdim=True)
+    return features.float().cpu().numpy().astype("float32")
+
+
+def embed_frames(frames, clip_processor, clip_model, device: str,
+                 batch_size: int = EMBED_BATCH) -> np.ndarray:
+    """[n, dim] normalized image embeddings; only one batch of frames is in memory at once."""
+    batches = []
+    for start in range(0, len(frames), batch_size):
+        # Copies just this slice out of the memmap
+        batch = list(np.asarray(frames[start:start + batch_size]))
+        inputs = clip_processor(images=batch, return_tensors="pt").to(device)
+        with torch.inference_mode():
+            batches.append(_normalize(clip_model.get_image_features(**inputs)))
+    return np.concatenate(batches)
+
+
+def embed_text(text: str, clip_processor, clip_model, device: str) -> np.ndarray:
+    inputs = clip_processor(text=[text], return_tensors="pt", padding=True).to(device)
+    with torch.inference_mode():
+        return _normalize(clip_model.get_text_features(**inputs))
+
+
+def new_index(dim: int, index_type: str = INDEX_TYPE):
+    if index_type == "flat":
+        return faiss.IndexFlatIP(dim)
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+        return index
+    raise ValueError(f"INDEX_TYPE must be 'flat' or 'hnsw', got {index_type!r}")
+
+
+def index_path(directory: str, model_id: str, index_type: str = INDEX_TYPE) -> str:
+    # Vectors from different CLIP checkpoints aren't comparable, so each gets its own file
+    return os.path.join(directory, f"{model_id.split('/')[-1]}_{index_type}.faiss")
+
+
+def load_or_build_index(directory: str, frames, clip_processor, clip_model, model_id: str,
+                        device: str, index_type: str = INDEX_TYPE,
+                        batch_size: int = EMBED_BATCH):
+    """Reads the saved index for these frames, or embeds them and saves a new one."""
+    path = index_path(directory, model_id, index_type)
+    if os.path.exists(path):
+        index = faiss.read_index(path)
+        if index.ntotal == len(frames):
+            if index_type == "hnsw":
+                index.hnsw.efSearch = HNSW_EF_SEARCH
+            return index
+
+    embeddings = embed_frames(frames, clip_processor, clip_model, device, batch_size)
+    index = new_index(embeddings.shape[1], index_type)
+    index.add(embeddings)
+    faiss.write_index(index, path + ".tmp")
+    os.replace(path + ".tmp", path)
+    return index
+
+
+def search(index, query: np.ndarray, top_k: int):
+    """[(frame index, cosine similarity)], best first."""
+    similarities, ids = index.search(query, min(top_k, index.ntotal))
+    return [(int(i), float(s)) for i, s in zip(ids[0], similarities[0]) if i != -1]
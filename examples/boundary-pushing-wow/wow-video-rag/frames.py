@@ -0,0 +1,133 @@
+"""
+Frame sampling for the video RAG app.
+
+`iter_frames` yields one frame every `rate_sec` seconds without decoding the
+whole video to RGB. For long gaps it seeks straight to the next sampled frame
+(CAP_PROP_POS_FRAMES). Otherwise it uses `grab()`, which skips the colour
+conversion of unsampled frames. Each kept frame is downsized to CLIP input
+resolution (shorter side 224, aspect ratio kept) as it is read.
+
+`load_frames` writes the sampled frames to a uint8 memmap in CACHE_DIR, keyed
+by a hash of the video. Re-opening a video maps that file instead of decoding
+it again, and only the frames being used are paged in.
+"""
+import hashlib
+import json
+import os
+
+import cv2
+import numpy as np
+
+CACHE_DIR = os.getenv("VIDEO_CACHE_DIR", "cache")
+CLIP_SIZE = 224
+# Seeking costs a decode from the previous keyframe, so it only pays off for long gaps
+SEEK_MIN_FRAMES = int(os.getenv("SEEK_MIN_FRAMES", "120"))
+_HASH_CHUNK = 1 << 20
+
+
+def video_hash(video_path: str) -> str:
+    """Hash of the file size plus its first, middle and last MiB.
+
+    Hashing all of a multi-GB recording would take longer than sampling it.
+    """
+    size = os.path.getsize(video_path)
+    digest = hashlib.sha256(str(size).encode())
+    with open(video_path, "rb") as f:
+        for offset in (0, max(0, size // 2 - _HASH_CHUNK // 2), max(0, size - _HASH_CHUNK)):
+            f.seek(offset)
+            digest.update(f.read(_HASH_CHUNK))
+    return digest.hexdigest()[:16]
+
+
+def clip_shape(width: int, height: int, size: int = CLIP_SIZE):
+    """(height, width) with the shorter side scaled to size, as CLIP's resize does."""
+    scale = size / min(width, height)
+    return max(size, round(height * scale)), max(size, round(width * scale))
+
+
+def iter_frames(video_path: str, rate_sec: float, size: int = CLIP_SIZE):
+    """Yields (timestamp_sec, RGB frame downsized to CLIP resolution)."""
+    video = cv2.VideoCapture(video_path)
+    if not video.isOpened():
+        raise IOError(f"Cannot open video: {video_path}")
+    try:
+        fps = video.get(cv2.CAP_PROP_FPS) or 30.0
+        interval = max(1, int(round(fps * rate_sec)))
+        width = int(video.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(video.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        height, width = clip_shape(width, height, size)
+        seek = interval >= SEEK_MIN_FRAMES
+        position = 0  # index of the next frame the decoder will return
+        target = 0
+        while True:
+            if seek and target != position:
+                if not video.set(cv2.CAP_PROP_POS_FRAMES, target):
+                    seek = False  # not seekable (e.g. some streams): fall back to grabbing
+            if not seek:
+                while position < target:
+                    if not video.grab():
+                        return
+                    position += 1
+            ok, frame = video.read()
+            if not ok:
+                return
+            frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+            yield target / fps, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            position = target + 1
+            target += interval
+    finally:
+        video.release()
+
+
+def frame_cache_dir(video_path: str, rate_sec: float, size: int = CLIP_SIZE,
+                    cache_dir: str = CACHE_DIR) -> str:
+    """Directory holding the sampled frames (and anything derived from them) of a video."""
+    return os.path.join(cache_dir, f"{video_hash(video_path)}_{rate_sec:g}s_{size}")
+
+
+def load_frames(video_path: str, rate_sec: float, size: int = CLIP_SIZE,
+                cache_dir: str = CACHE_DIR):
+    """Returns (frames, timestamps): a read-only [n, h, w, 3] memmap and each frame's second.
+
+    Frames are sampled once per (video, rate, size); later calls map the cached file.
+    """
+    directory = frame_cache_dir(video_path, rate_sec, size, cache_dir)
+    meta_path = os.path.join(directory, "frames.json")
+    frames_path = os.path.join(directory, "frames.u8")
+
+    if not os.path.exists(meta_path):
+        os.makedirs(directory, exist_ok=True)
+        timestamps, shape = [], None
+        # Frames are streamed to disk one at a time; the meta file marks a complete cache
+        with open(frames_path + ".tmp", "wb") as f:
+            for timestamp, frame in iter_frames(video_path, rate_sec, size):
+                f.write(frame.tobytes())
+                timestamps.append(timestamp)
+                shape = frame.shape
+        if not timestamps:
+            raise ValueError(f"No frames could be read from {video_path}")
+        os.replace(frames_path + ".tmp", frames_path)
+        with open(meta_path, "w") as f:
+            json.dump({"video": os.path.abspath(video_path), "shape": [len(timestamps), *shape],
+                       "timestamps": timestamps}, f)
+
+    return open_frames(directory)
+
+
+def open_frames(directory: str):
+    """Maps an existing frame cache: (frames memmap, timestamps)."""
+    with open(os.path.join(directory, "frames.json")) as f:
+        meta = json.load(f)
+    frames = np.memmap(os.path.join(directory, "frames.u8"), dtype=np.uint8, mode="r",
+                       shape=tuple(meta["shape"]))
+    return frames, meta["timestamps"]
+
+
+def video_duration(video_path: str) -> float:
+    """Length in seconds, from the container's frame count and rate."""
+    video = cv2.VideoCapture(video_path)
+    try:
+        fps = video.get(cv2.CAP_PROP_FPS) or 30.0
+        return video.get(cv2.CAP_PROP_FRAME_COUNT) / fps
+    finally:
+        video.release()
@@ -0,0 +1,106 @@
+"""
+Indexes a directory of videos into the library (see library.py).
+
+    python ingest_library.py /path/to/recordings --workers 8
+
+Worker processes sample frames from several videos at once (decoding is CPU
+bound). The main process embeds each finished video with CLIP in batches and
+appends it to new shards. Videos already in the library (same content hash)
+are skipped, so re-running after adding recordings only indexes the new ones.
+
+Throughput is reported in video-minutes indexed per wall-clock minute.
+"""
+import argparse
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import torch
+from transformers import CLIPModel, CLIPProcessor
+
+from frame_index import EMBED_BATCH, INDEX_TYPE, embed_frames
+from frames import frame_cache_dir, load_frames, video_duration, video_hash
+from library import LIBRARY_DIR, ShardWriter
+
+CLIP_MODEL_ID = os.getenv("CLIP_MODEL_ID", "openai/clip-vit-base-patch32")
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".mkv", ".avi", ".webm")
+
+
+def find_videos(directory):
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if name.lower().endswith(VIDEO_EXTENSIONS):
+                yield os.path.join(root, name)
+
+
+def sample_video(path, rate_sec):
+    """Worker: samples the video into its frame cache and returns its library record."""
+    start = time.perf_counter()
+    frames, timestamps = load_frames(path, rate_sec)
+    return {
+        "path": os.path.abspath(path),
+        "hash": video_hash(path),
+        "duration": video_duration(path),
+        "frames": len(timestamps),
+        "frame_cache": os.path.abspath(frame_cache_dir(path, rate_sec)),
+        "sample_seconds": round(time.perf_counter() - start, 2),
+    }
+
+
+def ingest(directory, rate_sec, workers, library_dir=LIBRARY_DIR, index_type=INDEX_TYPE,
+           batch_size=EMBED_BATCH):
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    clip_processor = CLIPProcessor.from_pretrained(CLIP_MODEL_ID)
+    clip_model = CLIPModel.from_pretrained(CLIP_MODEL_ID).to(device).eval()
+    writer = ShardWriter(library_dir, model_id=CLIP_MODEL_ID, rate_sec=rate_sec,
+                         index_type=index_type)
+
+    # Hashing reads only ~3 MiB per file, so known videos are skipped before decoding anything
+    pending, seen = [], set(writer.known_hashes)
+    for path in find_videos(directory):
+        digest = video_hash(path)
+        if digest not in seen:  # also drops copies of the same recording
+            seen.add(digest)
+            pending.append(path)
+    print(f"📂 {len(pending)} new video(s) in {directory} "
+          f"({len(writer.known_hashes)} already indexed)")
+    if not pending:
+        return
+
+    start = time.perf_counter()
+    video_seconds = 0.0
+    # spawn: forked workers would inherit the CLIP model and CUDA state of this process
+    with ProcessPoolExecutor(workers, mp_context=mp.get_context("spawn")) as pool:
+        futures = {pool.submit(sample_video, path, rate_sec): path for path in pending}
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                record = future.result()
+            except Exception as exc:
+                print(f"⚠️ Skipping {futures[future]}: {exc}")
+                continue
+            # Embedding here overlaps with the workers decoding the next videos
+            frames, timestamps = load_frames(record["path"], rate_sec)
+            embeddings = embed_frames(frames, clip_processor, clip_model, device, batch_size)
+            video_id = writer.add_video(record, embeddings, timestamps)
+            video_seconds += record["duration"]
+            print(f"[{done}/{len(pending)}] #{video_id} {os.path.basename(record['path'])}: "
+                  f"{record['frames']} frames, {record['duration'] / 60:.1f} min")
+    writer.seal()
+
+    wall_minutes = (time.perf_counter() - start) / 60
+    print(f"\n✅ Indexed {video_seconds / 60:.1f} video-minutes in {wall_minutes:.2f} min "
+          f"= {video_seconds / 60 / wall_minutes:.1f} video-min per minute")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index a directory of videos for search")
+    parser.add_argument("directory")
+    parser.add_argument("--rate-sec", type=float, default=5, help="Seconds between frames")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--library-dir", default=LIBRARY_DIR)
+    parser.add_argument("--index-type", choices=["flat", "hnsw"], default=INDEX_TYPE)
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH)
+    args = parser.parse_args()
+    ingest(args.directory, args.rate_sec, args.workers, args.library_dir, args.index_type,
+           args.batch_size)
@@ -0,0 +1,187 @@
+"""
+A searchable library of many videos, stored as append-only FAISS shards.
+
+Every ingest run writes new shards to LIBRARY_DIR and never modifies existing
+ones. A shard has three files:
+
+* ``shard_00003.npz``: per vector, its video id, frame number and timestamp
+* ``shard_00003.json``: the videos it holds (path, hash, duration, frame cache)
+* ``shard_00003.faiss``: the frame embeddings, written last so that its
+  presence marks a complete shard
+
+`Library.load` puts all shards behind one `faiss.IndexShards`, so a query
+searches the whole library in a single call. Global ids are assigned in
+shard order, which lets the concatenated metadata arrays be indexed by them.
+"""
+import glob
+import json
+import os
+
+import faiss
+import numpy as np
+
+from frame_index import HNSW_EF_SEARCH, INDEX_TYPE, new_index
+from frames import open_frames
+
+LIBRARY_DIR = os.getenv("LIBRARY_DIR", "library")
+SHARD_MAX_VECTORS = int(os.getenv("SHARD_MAX_VECTORS", "200000"))
+
+
+def _shard_paths(root):
+    return sorted(glob.glob(os.path.join(root, "shard_*.faiss")))
+
+
+def _next_shard_number(root):
+    # Leftovers of an interrupted seal (.npz/.json without .faiss) count too, so no name is reused
+    numbers = []
+    for path in glob.glob(os.path.join(root, "shard_*.*")):
+        stem = os.path.basename(path).split(".")[0][len("shard_"):]
+        if stem.isdigit():
+            numbers.append(int(stem))
+    return max(numbers, default=-1) + 1
+
+
+def _read_shard(path):
+    with open(path[:-len(".faiss")] + ".json") as f:
+        return json.load(f)
+
+
+class Library:
+    def __init__(self, root=LIBRARY_DIR):
+        self.root = root
+        self.videos = {}  # video id -> record
+        self.index = None
+        self.video_ids = np.zeros(0, dtype=np.int32)
+        self.frame_numbers = np.zeros(0, dtype=np.int32)
+        self.timestamps = np.zeros(0, dtype=np.float32)
+        self.model_id = None
+        self._shards = []  # IndexShards doesn't keep its sub-indexes alive
+        self._frames = {}  # video id -> frames memmap, opened on first use
+
+    @property
+    def shard_count(self):
+        return len(_shard_paths(self.root))
+
+    @classmethod
+    def load(cls, root=LIBRARY_DIR):
+        library = cls(root)
+        columns = {"video_ids": [], "frame_numbers": [], "timestamps": []}
+        for path in _shard_paths(root):
+            shard = _read_shard(path)
+            if library.model_id not in (None, shard["model_id"]):
+                raise ValueError(f"{path} was embedded with {shard['model_id']}, "
+                                 f"not {library.model_id}")
+            library.model_id = shard["model_id"]
+            for record in shard["videos"]:
+                library.videos[record["video_id"]] = record
+
+            index = faiss.read_index(path)
+            if isinstance(index, faiss.IndexHNSW):
+                index.hnsw.efSearch = HNSW_EF_SEARCH
+            if library.index is None:
+                # successive_ids: shard i's ids start after those of shards 0..i-1
+                library.index = faiss.IndexShards(index.d, True, True)
+                library.index.metric_type = faiss.METRIC_INNER_PRODUCT
+            library._shards.append(index)
+            library.index.add_shard(index)
+
+            with np.load(path[:-len(".faiss")] + ".npz") as meta:
+                for name in columns:
+                    columns[name].append(meta[name])
+        if library.index is not None:
+            for name, parts in columns.items():
+                setattr(library, name, np.concatenate(parts))
+        return library
+
+    def __len__(self):
+        return len(self.video_ids)
+
+    def search(self, query, top_k):
+        """[{video, timestamp, similarity, frame}], best first, across every video."""
+        if self.index is None or not len(self):
+            return []
+        similarities, ids = self.index.search(query, min(top_k, len(self)))
+        hits = []
+        for i, similarity in zip(ids[0], similarities[0]):
+            if i == -1:
+                continue
+            video_id = int(self.video_ids[i])
+            hits.append({
+                "video": self.videos[video_id],
+                "timestamp": float(self.timestamps[i]),
+                "similarity": float(similarity),
+                "frame": self.frame(video_id, int(self.frame_numbers[i])),
+            })
+        return hits
+
+    def frame(self, video_id, frame_number):
+        if video_id not in self._frames:
+            self._frames[video_id] = open_frames(self.videos[video_id]["frame_cache"])[0]
+        return np.asarray(self._frames[video_id][frame_number])
+
+
+class ShardWriter:
+    """Collects embeddings of newly ingested videos and writes them out as new shards."""
+
+    def __init__(self, root=LIBRARY_DIR, model_id=None, rate_sec=None, index_type=INDEX_TYPE,
+                 max_vectors=SHARD_MAX_VECTORS):
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        self.model_id = model_id
+        self.rate_sec = rate_sec
+        self.index_type = index_type
+        self.max_vectors = max_vectors
+        # Only the shards' video lists are needed here, not their indexes
+        existing = [v for path in _shard_paths(root) for v in _read_shard(path)["videos"]]
+        self.next_shard = _next_shard_number(root)
+        self.next_video_id = max((v["video_id"] for v in existing), default=-1) + 1
+        self.known_hashes = {v["hash"] for v in existing}
+        self._reset()
+
+    def _reset(self):
+        self.embeddings, self.records = [], []
+        self.video_ids, self.frame_numbers, self.timestamps = [], [], []
+
+    @property
+    def pending(self):
+        return sum(len(e) for e in self.embeddings)
+
+    def add_video(self, record, embeddings, timestamps):
+        """Queues one video's frame embeddings; returns its new video id.
+
+        Queued videos are sealed first if this one would push the shard past max_vectors,
+        so only a single video larger than max_vectors can make an oversized shard.
+        """
+        if self.records and self.pending + len(embeddings) > self.max_vectors:
+            self.seal()
+        video_id = self.next_video_id
+        self.next_video_id += 1
+        self.known_hashes.add(record["hash"])
+        self.records.append({**record, "video_id": video_id})
+        self.embeddings.append(embeddings)
+        self.video_ids.append(np.full(len(embeddings), video_id, dtype=np.int32))
+        self.frame_numbers.append(np.arange(len(embeddings), dtype=np.int32))
+        self.timestamps.append(np.asarray(timestamps, dtype=np.float32))
+        if self.pending >= self.max_vectors:
+            self.seal()
+        return video_id
+
+    def seal(self):
+        """Writes the queued videos as a new shard. Existing shards are left untouched."""
+        if not self.records:
+            return None
+        base = os.path.join(self.root, f"shard_{self.next_shard:05d}")
+        embeddings = np.concatenate(self.embeddings)
+        np.savez(base + ".npz", video_ids=np.concatenate(self.video_ids),
+                 frame_numbers=np.concatenate(self.frame_numbers),
+                 timestamps=np.concatenate(self.timestamps))
+        with open(base + ".json", "w") as f:
+            json.dump({"model_id": self.model_id, "rate_sec": self.rate_sec,
+                       "index_type": self.index_type, "videos": self.records}, f, indent=2)
+        index = new_index(embeddings.shape[1], self.index_type)
+        index.add(embeddings)
+        faiss.write_index(index, base + ".faiss.tmp")
+        os.replace(base + ".faiss.tmp", base + ".faiss")
+        self.next_shard += 1
+        self._reset()
+        return base + ".faiss"
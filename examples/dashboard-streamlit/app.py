@@ -1,26 +1,27 @@
 import numpy as np
-import pandas as pd
 import plotly.express as px
 import streamlit as st
 from umap import UMAP
 
+import datacache
+
 
 @st.cache
 def load_data(selected_dataset):
     if selected_dataset == "MNIST-Digits":
-        X = pd.read_csv(
+        X = datacache.read_csv(
             "https://saturn-public-data.s3.us-east-2.amazonaws.com/MNIST-1000/mnist-1000-input.csv"
         )
-        y = pd.read_csv(
+        y = datacache.read_csv(
             "https://saturn-public-data.s3.us-east-2.amazonaws.com/MNIST-1000/mnist-1000-labels.csv"
         )
         y = np.unique(y, return_inverse=True)[1]
 
     elif selected_dataset == "MNIST-Fashion":
-        X = pd.read_csv(
+        X = datacache.read_csv(
             "https://saturn-public-data.s3.us-east-2.amazonaws.com/MNIST-1000/fashion-1000-input.csv"
         )
-        y = pd.read_csv(
+        y = datacache.read_csv(
             "https://saturn-public-data.s3.us-east-2.amazonaws.com/MNIST-1000/fashion-1000-labels.csv"
         )
         y = np.unique(y, return_inverse=True)[1]
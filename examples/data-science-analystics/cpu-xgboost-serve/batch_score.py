@@ -0,0 +1,157 @@
+import argparse
+import os
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
+
+# ---------------------------------------------------------
+# Batch scoring for the nightly job: streams a Parquet/CSV file in Arrow
+# record batches, scores them on a process pool and writes Parquet.
+# Only a few batches are in flight at once, so memory stays bounded
+# no matter how large the input file is.
+# ---------------------------------------------------------
+
+MODEL_PATH = "model.joblib"
+FEATURES = ["Pclass", "Sex", "Age", "SibSp", "Parch", "Fare"]
+# train.py label-encodes Sex alphabetically
+SEX_CODES = {"female": 0, "male": 1}
+
+_model = None
+
+
+def _init_worker(model_path):
+    # Each worker process loads the model once, not once per batch
+    global _model
+    _model = joblib.load(model_path)
+    # One XGBoost thread per process; the pool provides the parallelism
+    _model.set_params(n_jobs=1)
+
+
+def _score(features):
+    # A single predict_proba gives both the class and its probability
+    return _model.predict_proba(features)[:, 1]
+
+
+def read_batches(path, batch_size):
+    """Yields Arrow record batches without loading the whole file."""
+    if path.endswith(".parquet"):
+        yield from pq.ParquetFile(path).iter_batches(batch_size=batch_size)
+    else:
+        # CSV blocks are sized in bytes; ~64 bytes per passenger row
+        options = pv.ReadOptions(block_size=max(batch_size * 64, 1 << 20))
+        yield from pv.open_csv(path, read_options=options)
+
+
+def to_features(batch):
+    columns = []
+    for name in FEATURES:
+        values = batch.column(batch.schema.get_field_index(name)).to_numpy(zero_copy_only=False)
+        if name == "Sex" and values.dtype == object:
+            values = np.array([SEX_CODES.get(v, np.nan) for v in values], dtype=np.float32)
+        columns.append(values)
+    # Missing values (e.g. Age) stay NaN and follow XGBoost's default branches
+    return np.column_stack(columns).astype(np.float32)
+
+
+def score_file(input_path, output_path, model_path=MODEL_PATH, workers=None, batch_size=100_000):
+    workers = workers or os.cpu_count()
+    writer = None
+    rows = 0
+
+    def write(batch, future):
+        nonlocal writer, rows
+        survival_probability = future.result()
+        out = pa.RecordBatch.from_arrays(
+            batch.columns
+            + [pa.array(survival_probability > 0.5), pa.array(survival_probability)],
+            names=batch.schema.names + ["survived", "survival_probability"],
+        )
+        if writer is None:
+            writer = pq.ParquetWriter(output_path, out.schema)
+        writer.write_batch(out)
+        rows += len(out)
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(model_path,)) as pool:
+        pending = deque()
+        for batch in read_batches(input_path, batch_size):
+            pending.append((batch, pool.submit(_score, to_features(batch))))
+            # Back-pressure: never hold more than two batches per worker in memory
+            if len(pending) >= 2 * workers:
+                write(*pending.popleft())
+        while pending:
+            write(*pending.popleft())
+
+    if writer is not None:
+        writer.close()
+    return rows
+
+
+def make_sample(path, n_rows, chunk=1_000_000):
+    """Writes a synthetic passenger Parquet file of n_rows, one chunk at a time."""
+    rng = np.random.default_rng(42)
+    schema = pa.schema([(name, pa.float32()) for name in FEATURES])
+    with pq.ParquetWriter(path, schema) as writer:
+        for start in range(0, n_rows, chunk):
+            n = min(chunk, n_rows - start)
+            rows = np.column_stack([
+                rng.integers(1, 4, n),
+                rng.integers(0, 2, n),
+                rng.uniform(0, 80, n),
+                rng.integers(0, 6, n),
+                rng.integers(0, 6, n),
+                rng.uniform(0, 520, n),
+            ]).astype(np.float32)
+            writer.write_table(pa.table(dict(zip(FEATURES, rows.T)), schema=schema))
+
+
+def scaling_report(input_path, model_path, batch_size):
+    max_workers = os.cpu_count()
+    # 1, 2, 4, ... up to and including every core
+    counts = sorted({2**i for i in range(max_workers.bit_length())} | {max_workers})
+
+    print(f"\n{'workers':>8} {'rows':>12} {'seconds':>9} {'rows/sec':>12} {'speedup':>8}")
+    baseline = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in counts:
+            start = time.perf_counter()
+            output_path = os.path.join(tmp, "out.parquet")
+            rows = score_file(input_path, output_path, model_path, workers, batch_size)
+            elapsed = time.perf_counter() - start
+            rate = rows / elapsed
+            baseline = baseline or rate
+            speedup = rate / baseline
+            print(f"{workers:>8} {rows:>12,} {elapsed:>9.2f} {rate:>12,.0f} {speedup:>7.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a Parquet/CSV file with the Titanic model")
+    parser.add_argument("input", help="Parquet or CSV file with columns " + ", ".join(FEATURES))
+    parser.add_argument("output", nargs="?", default="predictions.parquet")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--workers", type=int, default=None, help="Defaults to the number of cores")
+    parser.add_argument("--batch-size", type=int, default=100_000)
+    parser.add_argument(
+        "--make-sample", type=int, metavar="ROWS", help="First write a synthetic input of ROWS rows"
+    )
+    parser.add_argument("--scaling", action="store_true", help="Report rows/sec for 1 to N workers")
+    args = parser.parse_args()
+
+    if args.make_sample:
+        print(f"🧪 Writing {args.make_sample:,} synthetic rows to '{args.input}'...")
+        make_sample(args.input, args.make_sample)
+
+    if args.scaling:
+        scaling_report(args.input, args.model, args.batch_size)
+    else:
+        start = time.perf_counter()
+        rows = score_file(args.input, args.output, args.model, args.workers, args.batch_size)
+        elapsed = time.perf_counter() - start
+        print(f"✅ Scored {rows:,} rows in {elapsed:.2f}s ({rows / elapsed:,.0f} rows/sec)")
+        print(f"   Predictions saved to '{args.output}'")
@@ -0,0 +1,91 @@
+import asyncio
+import time
+
+import numpy as np
+
+
+class MicroBatcher:
+    """Coalesces concurrent prediction requests into a single predict_proba call.
+
+    Requests are queued and a background task drains the queue into one NumPy
+    matrix, waiting at most `max_wait_ms` after the first request or until
+    `max_batch_size` rows are collected, whichever comes first.
+    """
+
+    def __init__(self, predict_proba, max_batch_size=256, max_wait_ms=2.0, n_features=None):
+        self.predict_proba = predict_proba
+        self.n_features = n_features
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = None
+        self.worker = None
+        self.batches_run = 0
+        self.rows_scored = 0
+
+    async def start(self):
+        self.queue = asyncio.Queue()
+        self.worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            try:
+                await self.worker
+            except asyncio.CancelledError:
+                pass
+            self.worker = None
+
+    async def submit(self, rows):
+        """Queue a (n_rows, n_features) matrix and wait for its probabilities."""
+        # Reject malformed rows here so they can't break the batch they would share
+        matrix = np.asarray(rows, dtype=np.float32)
+        width = self.n_features
+        if matrix.ndim != 2 or (width is not None and matrix.shape[1] != width):
+            raise ValueError(f"expected rows of {width} features, got shape {matrix.shape}")
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((matrix, future))
+        return await future
+
+    async def _collect(self):
+        # Block for the first request, then keep filling the batch until the window closes
+        pending = [await self.queue.get()]
+        n_rows = len(pending[0][0])
+        deadline = time.perf_counter() + self.max_wait
+
+        while n_rows < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            pending.append(item)
+            n_rows += len(item[0])
+
+        return pending
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = await self._collect()
+
+            try:
+                matrix = np.concatenate([rows for rows, _ in pending])
+                # Run the booster off the event loop so new requests keep queuing
+                probs = await loop.run_in_executor(None, self.predict_proba, matrix)
+            except Exception as exc:
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+
+            self.batches_run += 1
+            self.rows_scored += len(matrix)
+
+            # Fan the rows back out to the callers that submitted them
+            offset = 0
+            for rows, future in pending:
+                if not future.done():
+                    future.set_result(probs[offset : offset + len(rows)])
+                offset += len(rows)
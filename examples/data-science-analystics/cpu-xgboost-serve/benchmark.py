@@ -0,0 +1,82 @@
+"""
+Latency and throughput of /predict at several client counts.
+
+    uvicorn main:app --port 8000 &
+    python benchmark.py --clients 1 16 256
+
+Measured results: per-request main.py from before the micro-batcher versus the
+current main.py (MAX_BATCH_SIZE=256, MAX_WAIT_MS=2). Each cell is the median
+of 3 runs with 50 requests per client. Setup: 1 vCPU shared by the server and
+the benchmark, Python 3.11, xgboost 3.2, and a 100-tree XGBClassifier with the
+same 6 features trained on synthetic rows (the Titanic CSV wasn't reachable).
+
+    clients |  before: p50 / p99 ms   req/s |  batched: p50 / p99 ms   req/s
+          1 |          3.98 /    8.28   234 |           5.20 /   7.37   187
+         16 |         59.47 /   86.44   270 |          29.62 /  50.67   502
+        256 |        860.37 / 1224.62   283 |         608.09 / 796.94   408
+
+With concurrent clients, the batcher roughly halves p50 at 16 clients and cuts
+p99 by about 35-40%. A lone client pays about 1 ms extra for the batching
+window. On one vCPU the benchmark's own threads compete with the server, so
+absolute numbers vary by +-25% between runs.
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+# Profile: 1st Class, Female (1), Age 22, 0 siblings, 0 parents, Fare 71.0
+passenger = [1, 1, 22, 0, 0, 71.0]
+
+
+def client(url, n_requests):
+    """Sends n_requests sequential /predict calls and returns each latency in ms."""
+    latencies = []
+    with requests.Session() as session:
+        for _ in range(n_requests):
+            start = time.perf_counter()
+            response = session.post(f"{url}/predict", json={"features": passenger})
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def run(url, concurrency, requests_per_client):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = pool.map(client, [url] * concurrency, [requests_per_client] * concurrency)
+        latencies = np.concatenate([np.array(r) for r in results])
+    elapsed = time.perf_counter() - start
+
+    return {
+        "clients": concurrency,
+        "requests": len(latencies),
+        "p50_ms": np.percentile(latencies, 50),
+        "p99_ms": np.percentile(latencies, 99),
+        "throughput_rps": len(latencies) / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency/throughput benchmark for /predict")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 16, 256])
+    parser.add_argument("--requests-per-client", type=int, default=50)
+    args = parser.parse_args()
+
+    # Warm up the server so the first measurement doesn't pay for lazy initialization
+    client(args.url, 10)
+
+    print(f"{'clients':>8} {'requests':>9} {'p50 ms':>9} {'p99 ms':>9} {'req/s':>10}")
+    for concurrency in args.clients:
+        r = run(args.url, concurrency, args.requests_per_client)
+        print(
+            f"{r['clients']:>8} {r['requests']:>9} {r['p50_ms']:>9.2f} "
+            f"{r['p99_ms']:>9.2f} {r['throughput_rps']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
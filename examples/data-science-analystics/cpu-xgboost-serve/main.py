@@ -1,24 +1,62 @@
+import os
+from typing import Annotated
+
 from fastapi import FastAPI
 import joblib
 import numpy as np
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from batcher import MicroBatcher
+from tree_engine import TreeEnsemble
+
+# Batching window: wait at most MAX_WAIT_MS for up to MAX_BATCH_SIZE rows
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "256"))
+MAX_WAIT_MS = float(os.getenv("MAX_WAIT_MS", "2"))
+# Set TREE_ENGINE=1 to score with the flat NumPy tree engine instead of the XGBoost predictor
+USE_TREE_ENGINE = os.getenv("TREE_ENGINE", "0") == "1"
+N_FEATURES = 6  # [Pclass, Sex, Age, SibSp, Parch, Fare]
 
 app = FastAPI(title="Titanic Survival Predictor")
 model = joblib.load("model.joblib")
+predict_proba = TreeEnsemble.from_xgboost(model).predict_proba if USE_TREE_ENGINE else model.predict_proba
+batcher = MicroBatcher(predict_proba, MAX_BATCH_SIZE, MAX_WAIT_MS, n_features=N_FEATURES)
+
+# Rows of the wrong width get a 422 instead of failing a shared batch
+Features = Annotated[list[float], Field(min_length=N_FEATURES, max_length=N_FEATURES)]
 
 class Passenger(BaseModel):
-    features: list[float] # [Pclass, Sex, Age, SibSp, Parch, Fare]
+    features: Features # [Pclass, Sex, Age, SibSp, Parch, Fare]
 
-@app.post("/predict")
-def predict(data: Passenger):
-    features = np.array(data.features).reshape(1, -1)
-    prediction = model.predict(features)[0]
-    prob = model.predict_proba(features)[0]
-    
+class PassengerBatch(BaseModel):
+    passengers: list[Features]
+
+@app.on_event("startup")
+async def start_batcher():
+    await batcher.start()
+
+@app.on_event("shutdown")
+async def stop_batcher():
+    await batcher.stop()
+
+def format_result(prob):
+    # The predicted class is the most probable one, so a single predict_proba is enough
+    prediction = int(np.argmax(prob))
     status = "SURVIVED" if prediction == 1 else "DID NOT SURVIVE"
-    
+
     return {
         "result": status,
-        "probability": f"{round(np.max(prob) * 100, 2)}%",
+        "probability": f"{round(float(np.max(prob)) * 100, 2)}%",
         "data_source": "Existing Titanic Dataset"
-    }
\ No newline at end of file
+    }
+
+@app.post("/predict")
+async def predict(data: Passenger):
+    probs = await batcher.submit([data.features])
+    return format_result(probs[0])
+
+@app.post("/predict_batch")
+async def predict_batch(data: PassengerBatch):
+    if not data.passengers:
+        return {"predictions": []}
+    probs = await batcher.submit(data.passengers)
+    return {"predictions": [format_result(prob) for prob in probs]}
@@ -22,4 +22,8 @@ python train.py
 
 echo -e "${GREEN}✅ Setup Complete!${NC}"
 echo "To start the server, run:"
-echo "source venv_xgboost/bin/activate && uvicorn main:app --reload"
\ No newline at end of file
+echo "source venv_xgboost/bin/activate && uvicorn main:app --reload"
+echo "To benchmark /predict latency at 1, 16 and 256 concurrent clients, run:"
+echo "python benchmark.py"
+echo "To score a large Parquet/CSV file on every core, run:"
+echo "python batch_score.py passengers.parquet predictions.parquet"
@@ -11,4 +11,14 @@ result = response.json()
 
 print("\n--- Prediction Reply ---")
 print(f"Outcome:     {result['result']}")
-print(f"Confidence:  {result['probability']}")
\ No newline at end of file
+print(f"Confidence:  {result['probability']}")
+
+# Profile: 3rd Class, Male (0), Age 35, 0 siblings, 0 parents, Fare 8.05
+passenger_2 = [3, 0, 35, 0, 0, 8.05]
+
+print("\n🚀 Predicting Survival for a batch of passengers...")
+response = requests.post(f"{url}_batch", json={"passengers": [passenger_1, passenger_2]})
+
+print("\n--- Batch Prediction Reply ---")
+for prediction in response.json()["predictions"]:
+    print(f"Outcome:     {prediction['result']} ({prediction['probability']})")
@@ -0,0 +1,45 @@
+import time
+
+import joblib
+import numpy as np
+
+from tree_engine import TreeEnsemble
+
+model = joblib.load("model.joblib")
+engine = TreeEnsemble.from_xgboost(model)
+
+# Random passengers spanning the training ranges: [Pclass, Sex, Age, SibSp, Parch, Fare]
+rng = np.random.default_rng(42)
+n_rows = 20000
+X = np.column_stack([
+    rng.integers(1, 4, n_rows),
+    rng.integers(0, 2, n_rows),
+    rng.uniform(0, 80, n_rows),
+    rng.integers(0, 6, n_rows),
+    rng.integers(0, 6, n_rows),
+    rng.uniform(0, 520, n_rows),
+]).astype(np.float32)
+# Exercise the default (missing value) branches as well
+X[rng.random(X.shape) < 0.05] = np.nan
+
+# 1. Parity: the engine must reproduce predict_proba bit for bit
+expected = model.predict_proba(X)
+actual = engine.predict_proba(X)
+assert actual.dtype == expected.dtype, (actual.dtype, expected.dtype)
+assert np.array_equal(actual, expected), f"max abs diff {np.abs(actual - expected).max()}"
+assert np.array_equal(engine.predict(X), model.predict(X))
+print(f"✅ Parity: {n_rows} rows match model.predict_proba exactly")
+
+
+# 2. Benchmark: per-row cost of single-row calls and of one batched call
+def per_row_us(fn, rows, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(rows)
+    return (time.perf_counter() - start) / (repeats * len(rows)) * 1e6
+
+
+single = X[:1]
+print(f"\n{'path':<28} {'single row':>14} {'batch of ' + str(n_rows):>16}")
+for name, fn in [("model.predict_proba", model.predict_proba), ("TreeEnsemble.predict_proba", engine.predict_proba)]:
+    print(f"{name:<28} {per_row_us(fn, single, 1000):>11.1f} us {per_row_us(fn, X, 5):>13.2f} us")
@@ -1,9 +1,11 @@
 from fastapi import FastAPI
 from pydantic import BaseModel
-import joblib
 import numpy as np
 import os
 
+from model_store import ModelStore
+from tree_engine import TreeEnsemble
+
 app = FastAPI(title="Auto-Tuned Iris API")
 
 # Define Input Schema
@@ -13,23 +15,41 @@ class IrisData(BaseModel):
     petal_length: float
     petal_width: float
 
-# Global Model Variable
-model = None
+# Model Store: serves the latest best_model.pkl and hot-swaps it after every tuning run
 MODEL_PATH = "best_model.pkl"
+POLL_INTERVAL = float(os.getenv("MODEL_POLL_INTERVAL", "2"))
+# Set TREE_ENGINE=1 to score with the flat NumPy tree engine instead of scikit-learn
+USE_TREE_ENGINE = os.getenv("TREE_ENGINE", "0") == "1"
+
+def compile_model(model):
+    engine = TreeEnsemble.from_sklearn(model)
+    print(f"⚡ Compiled {len(engine.roots)} trees into the flat tree engine")
+    return engine
+
+store = ModelStore(
+    MODEL_PATH,
+    n_features=4,
+    poll_interval=POLL_INTERVAL,
+    prepare=compile_model if USE_TREE_ENGINE else None,
+)
 
 @app.on_event("startup")
 def load_model():
-    global model
-    if os.path.exists(MODEL_PATH):
-        model = joblib.load(MODEL_PATH)
-        print(f"✅ Loaded optimized model: {MODEL_PATH}")
-    else:
-        print(f"⚠️ Error: {MODEL_PATH} not found. Run 'python tune_hpo.py' first.")
+    if not os.path.exists(MODEL_PATH):
+        print(f"⚠️ Error: {MODEL_PATH} not found. Run 'python tune_hpo.py' (the API picks it up automatically).")
+    store.start()
+
+@app.on_event("shutdown")
+def stop_model_store():
+    store.stop()
 
 @app.post("/predict")
 def predict(data: IrisData):
-    if not model:
+    # Take one reference so a concurrent swap can't change the model mid-request
+    version = store.current
+    if version is None:
         return {"error": "Model not loaded"}
+    store.record_request(version)
     
     # Prepare features
     features = np.array([[
@@ -40,16 +60,21 @@ def predict(data: IrisData):
     ]])
     
     # Predict
-    prediction = int(model.predict(features)[0])
+    prediction = int(version.model.predict(features)[0])
     
     # Map to Class Name
     classes = {0: "setosa", 1: "versicolor", 2: "virginica"}
     
     return {
         "class_id": prediction,
-        "class_name": classes.get(prediction, "unknown")
+        "class_name": classes.get(prediction, "unknown"),
+        "model_version": version.version
     }
 
+@app.get("/models")
+def models():
+    return store.stats()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
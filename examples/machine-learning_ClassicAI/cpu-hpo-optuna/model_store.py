@@ -0,0 +1,142 @@
+"""
+Versioned model store with hot reload.
+
+A background thread polls the model artifact (mtime and size first, then a
+SHA-256 of the contents). When a new artifact appears it is loaded and warmed
+up with a synthetic batch in that thread, and only then swapped in with a
+single reference assignment. Requests read `store.current` once and keep using
+that version, so a reload never blocks or interrupts them.
+"""
+import hashlib
+import io
+import os
+import threading
+import time
+
+import joblib
+import numpy as np
+
+
+class ModelVersion:
+    def __init__(self, version, model, sha256, mtime, load_seconds, warmup_seconds):
+        self.version = version
+        self.model = model
+        self.sha256 = sha256
+        self.mtime = mtime
+        self.loaded_at = time.time()
+        self.load_seconds = load_seconds
+        self.warmup_seconds = warmup_seconds
+        self.requests = 0
+
+    def to_dict(self):
+        return {
+            "version": self.version,
+            "sha256": self.sha256[:12],
+            "artifact_mtime": self.mtime,
+            "loaded_at": self.loaded_at,
+            "load_ms": round(self.load_seconds * 1000, 2),
+            "warmup_ms": round(self.warmup_seconds * 1000, 2),
+            "requests": self.requests,
+        }
+
+
+class ModelStore:
+    def __init__(self, path, n_features, poll_interval=2.0, warmup_rows=64, prepare=None):
+        self.path = path
+        self.n_features = n_features
+        self.poll_interval = poll_interval
+        self.warmup_rows = warmup_rows
+        # Optional hook to convert the unpickled object before serving (e.g. compile it)
+        self.prepare = prepare
+        self.current = None
+        # Stats of replaced versions only; holding them would keep every old model in memory
+        self.history = []
+        self.max_history = 50
+        self.loaded = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._seen_stat = None
+
+    def start(self):
+        """Loads the artifact if it exists, then starts watching it for changes."""
+        stat = self._stat()
+        if stat is not None:
+            self._seen_stat = stat
+            try:
+                self._load(stat)
+            except Exception as exc:
+                print(f"⚠️ Failed to load {self.path}, waiting for a new artifact: {exc}")
+        self._thread = threading.Thread(target=self._watch, name="model-store", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def record_request(self, version):
+        with self._lock:
+            version.requests += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "current": self.current.version if self.current else None,
+                "path": self.path,
+                "versions": self.history + ([self.current.to_dict()] if self.current else []),
+            }
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            stat = self._stat()
+            if stat is None or stat == self._seen_stat:
+                continue
+            # Wait one more poll for the stat to settle so we never read a half-written file
+            if self._stop.wait(self.poll_interval):
+                break
+            if stat != self._stat():
+                continue
+            self._seen_stat = stat
+            try:
+                self._load(stat)
+            except Exception as exc:
+                print(f"⚠️ Failed to load {self.path}, keeping the current model: {exc}")
+
+    def _load(self, stat):
+        with open(self.path, "rb") as f:
+            data = f.read()
+        sha256 = hashlib.sha256(data).hexdigest()
+        if self.current is not None and sha256 == self.current.sha256:
+            return  # touched but unchanged
+
+        start = time.perf_counter()
+        # Unpickle the bytes that were hashed: reopening the path could read a newer file
+        model = joblib.load(io.BytesIO(data))
+        if self.prepare is not None:
+            model = self.prepare(model)
+        load_seconds = time.perf_counter() - start
+
+        # Warm up allocations and lazy initialization before the model takes traffic
+        start = time.perf_counter()
+        model.predict(np.random.default_rng(0).random((self.warmup_rows, self.n_features)))
+        warmup_seconds = time.perf_counter() - start
+
+        with self._lock:
+            self.loaded += 1
+            version = ModelVersion(
+                self.loaded, model, sha256, stat[0] / 1e9, load_seconds, warmup_seconds
+            )
+            if self.current is not None:
+                self.history = (self.history + [self.current.to_dict()])[-self.max_history:]
+            # A single reference assignment, so readers see either the old or the new version.
+            # The old model is freed once the requests still holding it finish.
+            self.current = version
+        print(f"✅ Loaded model version {version.version} from {self.path} ({sha256[:12]})")
@@ -0,0 +1,36 @@
+import time
+
+import joblib
+import numpy as np
+from sklearn.datasets import load_iris
+
+from tree_engine import TreeEnsemble
+
+model = joblib.load("best_model.pkl")
+engine = TreeEnsemble.from_sklearn(model)
+
+# Iris rows plus random jitter so every split is exercised on both sides
+X_iris = load_iris().data
+rng = np.random.default_rng(42)
+X = np.vstack([X_iris, X_iris[rng.integers(0, len(X_iris), 20000)] + rng.normal(0, 0.5, (20000, 4))])
+
+# 1. Parity: the engine must reproduce predict_proba bit for bit
+expected = model.predict_proba(X)
+actual = engine.predict_proba(X)
+assert np.array_equal(actual, expected), f"max abs diff {np.abs(actual - expected).max()}"
+assert np.array_equal(engine.predict(X), model.predict(X))
+print(f"✅ Parity: {len(X)} rows match model.predict_proba exactly")
+
+
+# 2. Benchmark: per-row cost of single-row calls and of one batched call
+def per_row_us(fn, rows, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(rows)
+    return (time.perf_counter() - start) / (repeats * len(rows)) * 1e6
+
+
+single = X[:1]
+print(f"\n{'path':<28} {'single row':>14} {'batch of ' + str(len(X)):>16}")
+for name, fn in [("model.predict_proba", model.predict_proba), ("TreeEnsemble.predict_proba", engine.predict_proba)]:
+    print(f"{name:<28} {per_row_us(fn, single, 1000):>11.1f} us {per_row_us(fn, X, 5):>13.2f} us")
@@ -0,0 +1,269 @@
+"""Flat-array inference engine for tree ensembles.
+
+Converts a fitted XGBoost booster or scikit-learn random forest into plain
+NumPy arrays once at startup, then scores whole batches with a vectorized,
+level-by-level traversal: every row walks every tree in lock-step, one depth
+level per iteration. The arithmetic mirrors the original libraries (float32
+features, the same split comparisons and the same per-tree accumulation order)
+so the probabilities are bit-for-bit identical to `model.predict_proba`.
+"""
+import json
+
+import numpy as np
+
+
+class TreeEnsemble:
+    def __init__(
+        self,
+        feature,
+        threshold,
+        left,
+        right,
+        default,
+        leaf_value,
+        roots,
+        tree_group,
+        max_depth,
+        kind,
+        base_margin=None,
+        classes=None,
+        rows_per_chunk=4096,
+    ):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default = default
+        self.leaf_value = leaf_value
+        self.roots = roots
+        self.tree_group = tree_group
+        self.max_depth = max_depth
+        self.kind = kind
+        self.base_margin = base_margin
+        self.classes = classes
+        self.rows_per_chunk = rows_per_chunk
+
+    # --- Converters ---
+
+    @classmethod
+    def from_xgboost(cls, model, **kwargs):
+        """Builds an engine from an XGBClassifier (or Booster) using its JSON dump."""
+        booster = model.get_booster() if hasattr(model, "get_booster") else model
+        learner = json.loads(booster.save_raw(raw_format="json"))["learner"]
+
+        gbm = learner["gradient_booster"]
+        if gbm["name"] != "gbtree":
+            raise ValueError(f"Unsupported booster '{gbm['name']}', only gbtree is supported")
+
+        objective = learner["objective"]["name"]
+        if objective not in ("binary:logistic", "multi:softprob"):
+            raise ValueError(f"Unsupported objective '{objective}'")
+
+        trees = gbm["model"]["trees"]
+        tree_group = np.asarray(gbm["model"]["tree_info"], dtype=np.int64)
+
+        # Honour early stopping the same way XGBClassifier.predict_proba does
+        n_groups = int(tree_group.max()) + 1 if len(tree_group) else 1
+        best_iteration = getattr(model, "best_iteration", None) if booster is not model else None
+        if best_iteration is not None:
+            per_iteration = len(trees) // booster.num_boosted_rounds()
+            trees = trees[: (best_iteration + 1) * per_iteration]
+            tree_group = tree_group[: len(trees)]
+
+        feature, threshold, left, right, default, value, roots = [], [], [], [], [], [], []
+        max_depth = 0
+        offset = 0
+        for tree in trees:
+            if any(tree.get("split_type", [])):
+                raise ValueError("Categorical splits are not supported")
+
+            t_left = np.asarray(tree["left_children"], dtype=np.int64)
+            t_right = np.asarray(tree["right_children"], dtype=np.int64)
+            t_cond = np.asarray(tree["split_conditions"], dtype=np.float32)
+            is_leaf = t_left == -1
+            nodes = np.arange(len(t_left))
+
+            # Leaves point back at themselves so extra traversal steps are no-ops
+            t_left = np.where(is_leaf, nodes, t_left)
+            t_right = np.where(is_leaf, nodes, t_right)
+            t_default = np.where(np.asarray(tree["default_left"], dtype=bool), t_left, t_right)
+
+            feature.append(np.where(is_leaf, 0, tree["split_indices"]))
+            # XGBoost stores the leaf value in split_conditions for leaf nodes
+            threshold.append(t_cond)
+            value.append(np.where(is_leaf, t_cond, np.float32(0)))
+            left.append(t_left + offset)
+            right.append(t_right + offset)
+            default.append(t_default + offset)
+            roots.append(offset)
+            max_depth = max(max_depth, _depth(t_left, t_right, is_leaf))
+            offset += len(t_left)
+
+        base_score = learner["learner_model_param"]["base_score"].strip("[]").split(",")
+        base_score = np.asarray([float(b) for b in base_score], dtype=np.float32)
+        if objective == "binary:logistic":
+            # ProbToMargin: -log(1 / p - 1), evaluated in float32 like the C++ code
+            base_margin = -_logf(np.float32(1.0) / base_score - np.float32(1.0))
+        else:
+            base_margin = base_score
+        base_margin = np.broadcast_to(base_margin, (n_groups,)).astype(np.float32)
+
+        return cls(
+            feature=np.concatenate(feature).astype(np.int64),
+            threshold=np.concatenate(threshold),
+            left=np.concatenate(left),
+            right=np.concatenate(right),
+            default=np.concatenate(default),
+            leaf_value=np.concatenate(value).astype(np.float32),
+            roots=np.asarray(roots, dtype=np.int64),
+            tree_group=tree_group,
+            max_depth=max_depth,
+            kind=objective,
+            base_margin=base_margin,
+            classes=getattr(model, "classes_", None),
+            **kwargs,
+        )
+
+    @classmethod
+    def from_sklearn(cls, model, **kwargs):
+        """Builds an engine from a fitted RandomForestClassifier or DecisionTreeClassifier."""
+        estimators = getattr(model, "estimators_", [model])
+        if model.n_outputs_ != 1:
+            raise ValueError("Multi-output forests are not supported")
+
+        feature, threshold, left, right, default, value, roots = [], [], [], [], [], [], []
+        max_depth = 0
+        offset = 0
+        for estimator in estimators:
+            tree = estimator.tree_
+            is_leaf = tree.children_left == -1
+            nodes = np.arange(tree.node_count)
+
+            t_left = np.where(is_leaf, nodes, tree.children_left)
+            t_right = np.where(is_leaf, nodes, tree.children_right)
+            # Rows with NaN follow missing_go_to_left when the tree was fit with missing values
+            go_left = getattr(tree, "missing_go_to_left", np.zeros(tree.node_count, dtype=bool))
+            t_default = np.where(np.asarray(go_left, dtype=bool), t_left, t_right)
+
+            # Same normalization as DecisionTreeClassifier.predict_proba
+            proba = tree.value[:, 0, : model.n_classes_].copy()
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            proba /= normalizer
+
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            value.append(proba)
+            left.append(t_left + offset)
+            right.append(t_right + offset)
+            default.append(t_default + offset)
+            roots.append(offset)
+            max_depth = max(max_depth, tree.max_depth)
+            offset += tree.node_count
+
+        return cls(
+            feature=np.concatenate(feature).astype(np.int64),
+            threshold=np.concatenate(threshold).astype(np.float64),
+            left=np.concatenate(left).astype(np.int64),
+            right=np.concatenate(right).astype(np.int64),
+            default=np.concatenate(default).astype(np.int64),
+            leaf_value=np.concatenate(value),
+            roots=np.asarray(roots, dtype=np.int64),
+            tree_group=np.zeros(len(roots), dtype=np.int64),
+            max_depth=max_depth,
+            kind="sklearn",
+            classes=model.classes_,
+            **kwargs,
+        )
+
+    # --- Inference ---
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if len(X) <= self.rows_per_chunk:
+            return self._predict_proba(X)
+        # Bound the (rows x trees) index matrices for very large batches
+        return np.concatenate(
+            [
+                self._predict_proba(X[start : start + self.rows_per_chunk])
+                for start in range(0, len(X), self.rows_per_chunk)
+            ]
+        )
+
+    def predict(self, X):
+        proba = self.predict_proba(X)
+        classes = self.classes if self.classes is not None else np.arange(proba.shape[1])
+        return np.take(classes, np.argmax(proba, axis=1))
+
+    def apply(self, X):
+        """Returns the global leaf index reached in every tree, shape (n_rows, n_trees)."""
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X))[:, np.newaxis]
+        nodes = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+
+        strict = self.kind != "sklearn"
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[nodes]]
+            # XGBoost goes left on x < split, scikit-learn on x <= threshold
+            go_left = x < self.threshold[nodes] if strict else x <= self.threshold[nodes]
+            nodes = np.where(
+                np.isnan(x),
+                self.default[nodes],
+                np.where(go_left, self.left[nodes], self.right[nodes]),
+            )
+        return nodes
+
+    def _predict_proba(self, X):
+        leaves = self.apply(X)
+        values = self.leaf_value[leaves]
+
+        if self.kind == "sklearn":
+            # RandomForestClassifier sums per-tree probabilities in order, then averages
+            proba = np.zeros((len(X), values.shape[2]), dtype=np.float64)
+            for t in range(leaves.shape[1]):
+                proba += values[:, t]
+            return proba / len(self.roots)
+
+        # XGBoost accumulates leaf values onto the base margin tree by tree in float32
+        margin = np.tile(self.base_margin, (len(X), 1))
+        for t in range(leaves.shape[1]):
+            margin[:, self.tree_group[t]] += values[:, t]
+
+        if self.kind == "binary:logistic":
+            prob = _sigmoidf(margin[:, 0])
+            return np.vstack((np.float32(1.0) - prob, prob)).transpose()
+        return _softmaxf(margin)
+
+
+def _depth(left, right, is_leaf):
+    depth = np.zeros(len(left), dtype=np.int64)
+    # Children always have a higher node id than their parent in XGBoost trees
+    for node in range(len(left)):
+        if not is_leaf[node]:
+            depth[left[node]] = depth[node] + 1
+            depth[right[node]] = depth[node] + 1
+    return int(depth.max())
+
+
+def _expf(x):
+    # Evaluate in float64 and round once, matching a correctly rounded C expf
+    return np.exp(x.astype(np.float64)).astype(np.float32)
+
+
+def _logf(x):
+    return np.log(x.astype(np.float64)).astype(np.float32)
+
+
+def _sigmoidf(x):
+    # common::Sigmoid: 1 / (exp(min(-x, 88.7)) + 1)
+    return np.float32(1.0) / (_expf(np.minimum(-x, np.float32(88.7))) + np.float32(1.0))
+
+
+def _softmaxf(margin):
+    # common::Softmax: subtract the row max, exponentiate, sum in double, then divide
+    wmax = margin.max(axis=1, keepdims=True)
+    exp = _expf(margin - wmax)
+    wsum = np.zeros((len(margin), 1), dtype=np.float64)
+    for k in range(margin.shape[1]):
+        wsum[:, 0] += exp[:, k]
+    return exp / wsum.astype(np.float32)
@@ -1,9 +1,10 @@
 from fastapi import FastAPI
 from pydantic import BaseModel
-import joblib
 import numpy as np
 import os
 
+from model_store import ModelStore
+
 # 1. Initialize API
 app = FastAPI(title="Iris Baseline API")
 
@@ -14,24 +15,29 @@ class IrisData(BaseModel):
     petal_length: float
     petal_width: float
 
-# 3. Load Model Global Variable
-model = None
+# 3. Model Store: loads the model and hot-swaps it whenever baseline.py saves a new one
 MODEL_PATH = "iris_model.pkl"
+POLL_INTERVAL = float(os.getenv("MODEL_POLL_INTERVAL", "2"))
+store = ModelStore(MODEL_PATH, n_features=4, poll_interval=POLL_INTERVAL)
 
 @app.on_event("startup")
 def load_model():
-    global model
-    if os.path.exists(MODEL_PATH):
-        model = joblib.load(MODEL_PATH)
-        print(f"✅ Loaded model from {MODEL_PATH}")
-    else:
-        print(f"⚠️ Error: {MODEL_PATH} not found. Did you run baseline_demo.py?")
+    if not os.path.exists(MODEL_PATH):
+        print(f"⚠️ Error: {MODEL_PATH} not found. Run 'python baseline.py' (the API picks it up automatically).")
+    store.start()
+
+@app.on_event("shutdown")
+def stop_model_store():
+    store.stop()
 
 # 4. Prediction Endpoint
 @app.post("/predict")
 def predict(data: IrisData):
-    if not model:
+    # Take one reference so a concurrent swap can't change the model mid-request
+    version = store.current
+    if version is None:
         return {"error": "Model not trained yet."}
+    store.record_request(version)
     
     # Convert input JSON to model-ready array
     features = np.array([[
@@ -42,16 +48,22 @@ def predict(data: IrisData):
     ]])
     
     # Predict Class (0, 1, or 2)
-    prediction = int(model.predict(features)[0])
+    prediction = int(version.model.predict(features)[0])
     
     # Map to String Name
     classes = {0: "setosa", 1: "versicolor", 2: "virginica"}
     return {
         "class_id": prediction,
-        "class_name": classes.get(prediction, "unknown")
+        "class_name": classes.get(prediction, "unknown"),
+        "model_version": version.version
     }
 
-# 5. Run Server (If executed directly)
+# 5. Model Versions: load latency and request counts per version
+@app.get("/models")
+def models():
+    return store.stats()
+
+# 6. Run Server (If executed directly)
 if __name__ == "__main__":
     import uvicorn
     # Host 0.0.0.0 is crucial for cloud servers to be accessible
@@ -32,11 +32,12 @@ echo -e "${BLUE}⬇️  Installing libraries...${NC}"
 source venv/bin/activate
 pip install --upgrade pip
 # Installing all required libraries for the Demo + API
-pip install scikit-learn pandas numpy matplotlib seaborn fastapi uvicorn joblib
+pip install scikit-learn pandas numpy matplotlib seaborn fastapi uvicorn joblib pyarrow
 
 echo -e "${GREEN}✅ Environment Ready!${NC}"
 echo "-------------------------------------------------------"
 echo "To run the full pipeline:"
 echo "1. Train & Save Model:  python baseline.py"
 echo "2. Start API Server:    python app.py"
+echo "3. Batch Score a File:  python batch_score.py input.parquet predictions.parquet"
 echo "-------------------------------------------------------"
\ No newline at end of file
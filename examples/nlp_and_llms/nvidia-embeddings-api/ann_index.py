@@ -0,0 +1,187 @@
+"""
+Index and text storage behind embeddings_service.py.
+
+`AnnIndex` wraps a FAISS index of one of three types:
+
+* ``flat``: exact brute-force search (the notebook's IndexFlatL2)
+* ``ivfpq``: inverted lists with product-quantized codes. Vectors are kept in
+  a flat index until there are enough to train on, then the IVF-PQ index is
+  trained and takes over automatically.
+* ``hnsw``: graph-based search, no training needed
+
+`TextStore` keeps the texts as an append-only UTF-8 blob plus an array of end
+offsets. Both files are memory-mapped on reload, so a restart does not read
+millions of texts into Python objects.
+"""
+import os
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("flat", "ivfpq", "hnsw")
+
+
+class AnnIndex:
+    def __init__(self, dim, index_type="flat", nlist=1024, pq_m=16, nprobe=16, hnsw_m=32,
+                 ef_search=64):
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"index_type must be one of {INDEX_TYPES}, got {index_type!r}")
+        self.dim = dim
+        self.index_type = index_type
+        self.nlist = nlist
+        self.pq_m = pq_m
+        self.nprobe = nprobe
+        self.hnsw_m = hnsw_m
+        self.ef_search = ef_search
+        self.trained = index_type != "ivfpq"
+        # IVF-PQ starts out as an exact flat index over the vectors seen so far
+        self.index = self._new_index() if self.trained else faiss.IndexFlatL2(dim)
+        self.path = None
+        self.mmapped = False
+
+    @property
+    def train_size(self):
+        # FAISS warns below ~39 training points per centroid
+        return 39 * self.nlist
+
+    def __len__(self):
+        return self.index.ntotal
+
+    def _new_index(self):
+        if self.index_type == "flat":
+            return faiss.IndexFlatL2(self.dim)
+        if self.index_type == "hnsw":
+            index = faiss.IndexHNSWFlat(self.dim, self.hnsw_m)
+            index.hnsw.efSearch = self.ef_search
+            return index
+        index = faiss.IndexIVFPQ(faiss.IndexFlatL2(self.dim), self.dim, self.nlist, self.pq_m, 8)
+        index.nprobe = self.nprobe
+        return index
+
+    def add(self, vectors):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if self.mmapped:
+            # Memory-mapped indexes are read-only; load a private copy on the first write
+            self.index = faiss.read_index(self.path)
+            self.mmapped = False
+        self.index.add(vectors)
+        if not self.trained and len(self) >= self.train_size:
+            self.train()
+
+    def train(self, sample=None):
+        """Replace the flat staging index with a trained IVF-PQ holding the same vectors.
+
+        The sample defaults to (a subset of) the staged vectors.
+        """
+        staged = self.index.reconstruct_n(0, len(self)) if len(self) else None
+        if sample is None:
+            # Training cost grows with the sample, and 256 points per list is plenty
+            rng = np.random.default_rng(0)
+            sample_size = min(len(staged), 256 * self.nlist)
+            sample = staged[rng.choice(len(staged), sample_size, replace=False)]
+
+        index = self._new_index()
+        index.train(np.ascontiguousarray(sample, dtype=np.float32))
+        if staged is not None:
+            index.add(staged)
+        self.index = index
+        self.trained = True
+        print(f"🎯 Trained IVF-PQ index on {len(sample)} vectors ({len(self)} indexed)")
+
+    def search(self, vectors, k):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        return self.index.search(vectors, k)
+
+    def save(self, path):
+        tmp = path + ".tmp"
+        faiss.write_index(self.index, tmp)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, **params):
+        try:
+            index = faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            mmapped = True
+        except RuntimeError:
+            # Not every index type can be memory-mapped by every FAISS build
+            index = faiss.read_index(path)
+            mmapped = False
+
+        if isinstance(index, faiss.IndexHNSW):
+            params["index_type"] = "hnsw"
+        elif isinstance(index, faiss.IndexIVFPQ):
+            params["index_type"] = "ivfpq"
+        elif params.get("index_type") != "ivfpq":
+            # A flat snapshot is only an untrained IVF-PQ if that's what was asked for
+            params["index_type"] = "flat"
+        ann = cls(index.d, **params)
+        ann.index = index
+        ann.trained = not (ann.index_type == "ivfpq" and isinstance(index, faiss.IndexFlat))
+        if isinstance(index, faiss.IndexIVFPQ):
+            index.nprobe = ann.nprobe
+        elif isinstance(index, faiss.IndexHNSW):
+            index.hnsw.efSearch = ann.ef_search
+        ann.path = path
+        ann.mmapped = mmapped
+        return ann
+
+
+class TextStore:
+    def __init__(self, directory):
+        self.blob_path = os.path.join(directory, "texts.bin")
+        self.offsets_path = os.path.join(directory, "offsets.i64")
+        self._blob = None
+        self._ends = np.zeros(0, dtype=np.int64)
+        self._pending = []  # texts added since the last flush
+
+    def __len__(self):
+        return len(self._ends) + len(self._pending)
+
+    def append(self, texts):
+        self._pending.extend(texts)
+
+    def __getitem__(self, i):
+        flushed = len(self._ends)
+        if i >= flushed:
+            return self._pending[i - flushed]
+        if self._blob is None:
+            return ""  # every flushed text so far was empty
+        start = self._ends[i - 1] if i > 0 else 0
+        return bytes(self._blob[start:self._ends[i]]).decode("utf-8")
+
+    def open(self, count):
+        """Memory-map the files, keeping only the first count texts (those the index knows)."""
+        if not os.path.exists(self.offsets_path) or os.path.getsize(self.offsets_path) == 0:
+            return
+        ends = np.memmap(self.offsets_path, dtype=np.int64, mode="r")
+        if len(ends) > count:
+            # The process stopped between writing texts and the index: drop the extra texts
+            blob_end = int(ends[count - 1]) if count else 0
+            del ends
+            with open(self.offsets_path, "r+b") as f:
+                f.truncate(count * 8)
+            with open(self.blob_path, "r+b") as f:
+                f.truncate(blob_end)
+        self._remap()
+
+    def flush(self):
+        """Append pending texts to the files; both only ever grow."""
+        if not self._pending:
+            return
+        data = [text.encode("utf-8") for text in self._pending]
+        base = int(self._ends[-1]) if len(self._ends) else 0
+        ends = base + np.cumsum([len(d) for d in data], dtype=np.int64)
+        with open(self.blob_path, "ab") as f:
+            f.write(b"".join(data))
+        with open(self.offsets_path, "ab") as f:
+            f.write(ends.tobytes())
+        self._pending = []
+        self._remap()
+
+    def _remap(self):
+        if os.path.getsize(self.offsets_path) == 0:
+            self._ends = np.zeros(0, dtype=np.int64)
+            return
+        self._ends = np.memmap(self.offsets_path, dtype=np.int64, mode="r")
+        if os.path.getsize(self.blob_path):
+            self._blob = np.memmap(self.blob_path, dtype=np.uint8, mode="r")
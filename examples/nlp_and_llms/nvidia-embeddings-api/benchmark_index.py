@@ -0,0 +1,115 @@
+"""
+Search latency versus corpus size for the index types in ann_index.py.
+
+Builds each index from synthetic clustered 384-dimensional vectors (the
+all-MiniLM-L6-v2 size), generated and added in chunks so the raw data is
+never held in memory at once, then times single-query searches.
+
+    python benchmark_index.py --sizes 10000 1000000 10000000 --types flat ivfpq hnsw
+
+Combinations whose index would not fit in --memory-gb are skipped. A flat or
+HNSW index over 10M vectors needs roughly 16-18 GB; IVF-PQ needs about 0.3 GB.
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from ann_index import INDEX_TYPES, AnnIndex
+
+DIM = 384
+CHUNK = 100_000
+N_CLUSTERS = 1000
+
+
+def clustered(rng, centers, n):
+    # Real sentence embeddings are clustered and unit length; uniform noise would be a worst case
+    points = centers[rng.integers(0, len(centers), n)] + rng.normal(0, 0.3, (n, DIM))
+    points /= np.linalg.norm(points, axis=1, keepdims=True)
+    return points.astype(np.float32)
+
+
+def index_bytes(index_type, n, pq_m, hnsw_m):
+    if index_type == "flat":
+        return n * DIM * 4
+    if index_type == "hnsw":
+        return n * (DIM * 4 + hnsw_m * 2 * 4)
+    # Codes plus ids; the flat staging copy only exists until training
+    return n * (pq_m + 8)
+
+
+def benchmark(index_type, n, args):
+    rng = np.random.default_rng(42)
+    centers = rng.normal(0, 1, (N_CLUSTERS, DIM))
+    # Small corpora get fewer lists so every list still has ~39 training points
+    nlist = max(1, min(args.nlist, n // 39))
+    ann = AnnIndex(DIM, index_type, nlist=nlist, pq_m=args.pq_m, nprobe=args.nprobe,
+                   hnsw_m=args.hnsw_m, ef_search=args.ef_search)
+    if index_type == "ivfpq":
+        # Train up front on a sample instead of staging millions of vectors in a flat index
+        ann.train(clustered(rng, centers, min(n, 256 * nlist)))
+
+    start = time.perf_counter()
+    for offset in range(0, n, CHUNK):
+        ann.add(clustered(rng, centers, min(CHUNK, n - offset)))
+    build_seconds = time.perf_counter() - start
+
+    queries = clustered(rng, centers, args.queries)
+    ann.search(queries[:10], args.k)  # warm-up
+    latencies = []
+    for q in queries:
+        start = time.perf_counter()
+        ann.search(q.reshape(1, -1), args.k)
+        latencies.append(time.perf_counter() - start)
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+
+    start = time.perf_counter()
+    ann.search(queries, args.k)
+    batch_qps = len(queries) / (time.perf_counter() - start)
+    return {
+        "index_type": index_type,
+        "vectors": n,
+        "build_s": round(build_seconds, 2),
+        "p50_ms": round(p50, 3),
+        "p99_ms": round(p99, 3),
+        "batch_qps": round(batch_qps, 1),
+        "est_memory_gb": round(index_bytes(index_type, n, args.pq_m, args.hnsw_m) / 1e9, 2),
+    }
+
+
+if __name__ == "__main__":
+    total_gb = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 1e9
+    parser = argparse.ArgumentParser(description="Search latency vs corpus size per index type")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1e4, 1e6, 1e7])
+    parser.add_argument("--types", nargs="+", choices=INDEX_TYPES, default=list(INDEX_TYPES))
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=4096)
+    parser.add_argument("--pq-m", type=int, default=16)
+    parser.add_argument("--nprobe", type=int, default=16)
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--ef-search", type=int, default=64)
+    parser.add_argument("--memory-gb", type=float, default=total_gb * 0.6,
+                        help="Skip runs whose index would need more (default: 60%% of RAM)")
+    parser.add_argument("--report", default="index_latency.json")
+    args = parser.parse_args()
+
+    rows = []
+    print(f"{'index':<7} {'vectors':>11} {'build s':>9} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'batch q/s':>10} {'mem GB':>7}")
+    for n in map(int, args.sizes):
+        for index_type in args.types:
+            need = index_bytes(index_type, n, args.pq_m, args.hnsw_m) / 1e9
+            if need > args.memory_gb:
+                print(f"{index_type:<7} {n:>11,} skipped: needs ~{need:.1f} GB")
+                continue
+            row = benchmark(index_type, n, args)
+            rows.append(row)
+            print(f"{index_type:<7} {n:>11,} {row['build_s']:>9.1f} {row['p50_ms']:>8.3f} "
+                  f"{row['p99_ms']:>8.3f} {row['batch_qps']:>10.0f} {row['est_memory_gb']:>7.2f}")
+
+    with open(args.report, "w") as f:
+        json.dump(rows, f, indent=2)
+    print(f"\n✅ Report saved to '{args.report}'")
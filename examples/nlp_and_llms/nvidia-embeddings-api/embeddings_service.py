@@ -0,0 +1,174 @@
+"""
+FastAPI Embeddings Service, packaged version of FastAPI_Embeddings_Service.ipynb.
+
+    uvicorn embeddings_service:app --host 0.0.0.0 --port 8002
+
+Configuration (environment variables):
+
+* ``INDEX_TYPE``: ``flat`` (default), ``ivfpq`` or ``hnsw``
+* ``IVF_NLIST`` / ``IVF_NPROBE`` / ``PQ_M``: IVF-PQ lists, lists probed per query, PQ sub-quantizers
+* ``HNSW_M`` / ``HNSW_EF_SEARCH``: HNSW graph degree and search breadth
+* ``INDEX_DIR``: snapshot directory (default ``index_data``)
+* ``SNAPSHOT_INTERVAL``: seconds between snapshots of new data (default 60, 0 disables)
+"""
+import json
+import os
+import threading
+import time
+
+from fastapi import FastAPI
+from pydantic import BaseModel, Field
+from sentence_transformers import SentenceTransformer
+
+from ann_index import AnnIndex, TextStore
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+DEVICE = os.getenv("DEVICE", "cpu")
+ENCODE_BATCH = int(os.getenv("ENCODE_BATCH", "256"))
+INDEX_DIR = os.getenv("INDEX_DIR", "index_data")
+SNAPSHOT_INTERVAL = float(os.getenv("SNAPSHOT_INTERVAL", "60"))
+INDEX_PARAMS = {
+    "index_type": os.getenv("INDEX_TYPE", "flat").lower(),
+    "nlist": int(os.getenv("IVF_NLIST", "1024")),
+    "nprobe": int(os.getenv("IVF_NPROBE", "16")),
+    "pq_m": int(os.getenv("PQ_M", "16")),
+    "hnsw_m": int(os.getenv("HNSW_M", "32")),
+    "ef_search": int(os.getenv("HNSW_EF_SEARCH", "64")),
+}
+INDEX_PATH = os.path.join(INDEX_DIR, "index.faiss")
+META_PATH = os.path.join(INDEX_DIR, "meta.json")
+
+print('🔧 Loading embedding model...')
+model = SentenceTransformer(MODEL_NAME, device=DEVICE)
+embedding_dim = model.get_sentence_embedding_dimension()
+print(f'✅ Model loaded — Embedding dimension: {embedding_dim}')
+
+os.makedirs(INDEX_DIR, exist_ok=True)
+# FAISS indexes aren't safe to search while another thread adds to them
+lock = threading.RLock()
+texts = TextStore(INDEX_DIR)
+if os.path.exists(INDEX_PATH):
+    index = AnnIndex.load(INDEX_PATH, **INDEX_PARAMS)
+    texts.open(len(index))
+    if index.index_type != INDEX_PARAMS["index_type"]:
+        print(f"⚠️ Snapshot is a {index.index_type} index; ignoring INDEX_TYPE")
+    print(f"📂 Loaded {len(index)} vectors from {INDEX_DIR} (memory-mapped: {index.mmapped})")
+else:
+    index = AnnIndex(embedding_dim, **INDEX_PARAMS)
+dirty = False
+last_snapshot = None
+
+
+def encode(batch):
+    return model.encode(batch, batch_size=ENCODE_BATCH, convert_to_numpy=True).astype("float32")
+
+
+def add_texts(new_texts):
+    global dirty
+    # Encoding is the slow part and needs no lock; chunks keep memory bounded for huge requests
+    for start in range(0, len(new_texts), ENCODE_BATCH * 16):
+        batch = new_texts[start:start + ENCODE_BATCH * 16]
+        vectors = encode(batch)
+        with lock:
+            index.add(vectors)
+            texts.append(batch)
+            dirty = True
+    return {'message': f'{len(new_texts)} texts added successfully.', 'total_texts': len(texts)}
+
+
+def add_text(text: str):
+    return add_texts([text])
+
+
+def search_texts(query: str, top_k: int = 3):
+    if len(texts) == 0:
+        return {'error': 'No texts in index. Please add some first.'}
+
+    query_vector = encode([query])
+    with lock:
+        D, I = index.search(query_vector, top_k)
+        results = [
+            {'text': texts[int(i)], 'distance': float(D[0][j])}
+            for j, i in enumerate(I[0]) if i != -1
+        ]
+    return {'query': query, 'results': results}
+
+
+def snapshot():
+    """Write new texts, the index and its metadata to INDEX_DIR."""
+    global dirty, last_snapshot
+    with lock:
+        if not dirty:
+            return False
+        start = time.perf_counter()
+        # Texts first: on reload, texts beyond the index's vector count are discarded
+        texts.flush()
+        index.save(INDEX_PATH)
+        with open(META_PATH, 'w') as f:
+            json.dump({'count': len(index), 'index_type': index.index_type,
+                       'trained': index.trained, 'model': MODEL_NAME}, f)
+        dirty = False
+        last_snapshot = time.time()
+    print(f'💾 Snapshot of {len(index)} vectors in {time.perf_counter() - start:.2f}s')
+    return True
+
+
+_stop = threading.Event()
+
+
+def _snapshot_loop():
+    while not _stop.wait(SNAPSHOT_INTERVAL):
+        try:
+            snapshot()
+        except Exception as exc:
+            print(f'⚠️ Snapshot failed: {exc}')
+
+
+app = FastAPI(title='FastAPI Embeddings Service')
+
+class TextIn(BaseModel):
+    text: str
+
+class TextsIn(BaseModel):
+    texts: list[str] = Field(min_length=1)
+
+class SearchQuery(BaseModel):
+    query: str
+    top_k: int = 3
+
+@app.on_event('startup')
+def start_snapshots():
+    if SNAPSHOT_INTERVAL > 0:
+        threading.Thread(target=_snapshot_loop, name='snapshot', daemon=True).start()
+
+@app.on_event('shutdown')
+def final_snapshot():
+    _stop.set()
+    snapshot()
+
+@app.post('/add_text')
+def add_text_endpoint(item: TextIn):
+    return add_text(item.text)
+
+@app.post('/add_texts')
+def add_texts_endpoint(items: TextsIn):
+    return add_texts(items.texts)
+
+@app.post('/search')
+def search_endpoint(query: SearchQuery):
+    return search_texts(query.query, query.top_k)
+
+@app.post('/snapshot')
+def snapshot_endpoint():
+    return {'written': snapshot(), 'count': len(texts)}
+
+@app.get('/healthz')
+def healthz():
+    return {
+        'status': 'ok',
+        'count': len(texts),
+        'index_type': index.index_type,
+        'trained': index.trained,
+        'train_size': index.train_size if not index.trained else None,
+        'last_snapshot': last_snapshot,
+    }
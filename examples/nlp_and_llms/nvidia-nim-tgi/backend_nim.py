@@ -1,32 +1,155 @@
-from openai import OpenAI
+import asyncio
 import os
+import random
 
-# set it up in the key in the environment first
-## sample free API key:  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
-API_KEY = "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"
+import httpx
+import openai
+from openai import AsyncOpenAI
 
-if not API_KEY:
-    raise ValueError("❌ NVIDIA_API_KEY is not set. Export it first!")
+# Set the key in the environment first: export NVIDIA_API_KEY=nvapi-...
+# It is checked on the first NIM call, so the local backend runs without it
+API_KEY = os.getenv("NVIDIA_API_KEY")
 
-client = OpenAI(
-    base_url="https://integrate.api.nvidia.com/v1",
-    api_key=API_KEY,
+# NIM_BASE_URL can point at any OpenAI-compatible server, e.g. mock_openai.py
+BASE_URL = os.getenv("NIM_BASE_URL", "https://integrate.api.nvidia.com/v1")
+MODEL = os.getenv("NIM_MODEL", "qwen/qwen3-next-80b-a3b-instruct")
+MAX_CONCURRENCY = int(os.getenv("NIM_MAX_CONCURRENCY", "16"))
+MAX_RETRIES = int(os.getenv("NIM_MAX_RETRIES", "3"))
+TIMEOUT = float(os.getenv("NIM_TIMEOUT", "120"))
+
+# Worth another try: rate limits, 5xx responses, timeouts and dropped connections
+RETRYABLE = (
+    openai.RateLimitError,
+    openai.InternalServerError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
 )
 
-def nim_chat(prompt, model="qwen/qwen3-next-80b-a3b-instruct", stream=False):
-    completion = client.chat.completions.create(
-        model=model,
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.6,
-        top_p=0.7,
-        max_tokens=1024,
-        stream=stream
-    )
 
+class NimClient:
+    """Async chat client sharing one connection pool, with bounded concurrency and retries."""
+
+    def __init__(self, base_url=BASE_URL, api_key=API_KEY, model=MODEL,
+                 max_concurrency=MAX_CONCURRENCY, max_retries=MAX_RETRIES, timeout=TIMEOUT,
+                 backoff=0.5, max_backoff=8.0):
+        self.model = model
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.base_url = base_url
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._client = None
+
+    @property
+    def client(self):
+        """The OpenAI client, created on first use."""
+        if self._client is None:
+            if not self.api_key:
+                raise ValueError("❌ NVIDIA_API_KEY is not set. Export it first!")
+            self._client = AsyncOpenAI(
+                base_url=self.base_url,
+                api_key=self.api_key,
+                max_retries=0,  # retried below, with jitter and under the concurrency limit
+                timeout=self.timeout,
+                http_client=httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=self.max_concurrency,
+                        max_keepalive_connections=self.max_concurrency,
+                    ),
+                    timeout=self.timeout,
+                ),
+            )
+        return self._client
+
+    def _delay(self, attempt, exc):
+        retry_after = getattr(getattr(exc, "response", None), "headers", {}).get("retry-after")
+        if retry_after:
+            try:
+                # A server asking for minutes would otherwise stall the caller that long
+                return min(float(retry_after), self.max_backoff)
+            except ValueError:
+                pass
+        # Full jitter keeps clients that failed together from retrying together
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    async def _create(self, prompt, stream, **params):
+        request = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": 0.6,
+            "top_p": 0.7,
+            "max_tokens": 1024,
+            **params,
+        }
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await self.client.chat.completions.create(stream=stream, **request)
+            except RETRYABLE as exc:
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(self._delay(attempt, exc))
+
+    async def chat(self, prompt, **params):
+        async with self.semaphore:
+            completion = await self._create(prompt, stream=False, **params)
+        return completion.choices[0].message.content
+
+    async def chat_stream(self, prompt, **params):
+        """Yields content deltas. Only opening the stream is retried, never a partial answer."""
+        async with self.semaphore:
+            completion = await self._create(prompt, stream=True, **params)
+            async for chunk in completion:
+                delta = chunk.choices[0].delta if chunk.choices else None
+                if delta and delta.content:
+                    yield delta.content
+
+    async def chat_batch(self, prompts, **params):
+        """Runs the prompts concurrently; a failed prompt gets an error instead of a response."""
+        results = await asyncio.gather(
+            *(self.chat(p, **params) for p in prompts), return_exceptions=True
+        )
+        return [
+            {"error": f"{type(r).__name__}: {r}"} if isinstance(r, Exception) else {"response": r}
+            for r in results
+        ]
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.close()
+
+
+nim = NimClient()
+
+
+def nim_chat(prompt, model=MODEL, stream=False):
+    """Blocking helper for scripts: the full answer, or a generator of deltas with stream=True."""
     if stream:
-        for chunk in completion:
-            delta = chunk.choices[0].delta
-            if delta and delta.content:
-                yield delta.content
-    else:
-        return completion.choices[0].message["content"]
+        return _stream_sync(prompt, model)
+    return asyncio.run(_chat_once(prompt, model))
+
+
+async def _chat_once(prompt, model):
+    client = NimClient(model=model)
+    try:
+        return await client.chat(prompt)
+    finally:
+        await client.aclose()
+
+
+def _stream_sync(prompt, model):
+    loop = asyncio.new_event_loop()
+    client = NimClient(model=model)
+    pieces = client.chat_stream(prompt)
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(pieces.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        loop.run_until_complete(pieces.aclose())
+        loop.run_until_complete(client.aclose())
+        loop.close()
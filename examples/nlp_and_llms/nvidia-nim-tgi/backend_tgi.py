@@ -1,7 +1,17 @@
+import os
+
 import torch
 from transformers import AutoTokenizer, AutoModelForCausalLM
 
-MODEL_ID = "HuggingFaceTB/SmolLM-1.7B-Instruct"
+from batching import ContinuousBatcher
+from prefix_cache import PrefixCache
+
+# HuggingFaceTB/SmolLM-135M-Instruct is a good choice on CPU
+MODEL_ID = os.getenv("TGI_MODEL_ID", "HuggingFaceTB/SmolLM-1.7B-Instruct")
+MAX_BATCH_SIZE = int(os.getenv("TGI_MAX_BATCH_SIZE", "16"))
+# Shared preamble prepended to every prompt; its KV cache is computed once and reused
+SYSTEM_PROMPT = os.getenv("TGI_SYSTEM_PROMPT", "")
+PREFIX_CACHE_MB = int(os.getenv("TGI_PREFIX_CACHE_MB", "1024"))  # 0 disables the prefix cache
 
 tokenizer = AutoTokenizer.from_pretrained(MODEL_ID)
 model = AutoModelForCausalLM.from_pretrained(
@@ -9,16 +19,24 @@ model = AutoModelForCausalLM.from_pretrained(
     device_map="auto",
     torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32
 )
+model.eval()
+
+# One scheduler owns the model; concurrent requests share its decode steps
+prefix_cache = PrefixCache(PREFIX_CACHE_MB * 2**20) if PREFIX_CACHE_MB > 0 else None
+batcher = ContinuousBatcher(
+    model, tokenizer, max_batch_size=MAX_BATCH_SIZE, prefix_cache=prefix_cache
+)
+
+
+def format_prompt(prompt, system_prompt=SYSTEM_PROMPT):
+    preamble = f"{system_prompt}\n\n" if system_prompt else ""
+    return f"{preamble}User: {prompt}\nAssistant:"
+
 
-def tgi_chat(prompt, max_tokens=256, temperature=0.7):
-    formatted_prompt = f"User: {prompt}\nAssistant:"
-    inputs = tokenizer(formatted_prompt, return_tensors="pt").to(model.device)
+def tgi_chat_stream(prompt, max_tokens=256, temperature=0.0):
+    """Yields the completion as text pieces while it is generated; greedy at temperature 0."""
+    return batcher.submit(format_prompt(prompt), max_tokens, temperature)
 
-    outputs = model.generate(
-        **inputs,
-        max_new_tokens=max_tokens,
-        temperature=temperature
-    )
 
-    text = tokenizer.decode(outputs[0], skip_special_tokens=True)
-    return text.split("Assistant:")[-1].strip()
+def tgi_chat(prompt, max_tokens=256, temperature=0.0):
+    return "".join(tgi_chat_stream(prompt, max_tokens, temperature)).strip()
@@ -0,0 +1,298 @@
+"""
+Continuous batching for the local Hugging Face backend.
+
+A single scheduler thread owns the model. Between decode steps it admits
+waiting prompts: they are prefilled together (left-padded), and their KV
+cache is merged into the running batch. Every active sequence then advances
+by one token per forward pass. Finished sequences leave the batch
+immediately instead of waiting for the longest one, so a short answer never
+waits behind a long one.
+
+Tokens are pushed to a per-request `TokenStream`, an iterator of decoded
+text pieces in the style of transformers' TextIteratorStreamer. A stream
+whose reader stops early (e.g. an SSE client disconnecting) is cancelled,
+and its row leaves the batch at the next step.
+
+With a `PrefixCache`, prefill starts from the cached keys and values of the
+longest prompt prefix seen before, and only the rest of the prompt is run
+through the model. After prefill, only the span a prompt shares with an
+earlier one is copied into the cache.
+"""
+import queue
+import threading
+import time
+
+import torch
+from transformers import DynamicCache
+
+_END = object()
+
+
+class TokenStream:
+    """Iterator over the decoded text of one request, filled by the scheduler."""
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self.token_ids = []
+        self.submitted_at = time.perf_counter()
+        self.first_token_at = None
+        self.finished_at = None
+        self.cancelled = False
+        self._queue = queue.Queue()
+        self._emitted = 0
+
+    @property
+    def ttft(self):
+        return self.first_token_at - self.submitted_at if self.first_token_at else None
+
+    def put(self, token_id):
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        self.token_ids.append(token_id)
+        text = self.tokenizer.decode(self.token_ids, skip_special_tokens=True)
+        if text.endswith("\ufffd"):
+            return  # a multi-byte character is split across tokens; wait for the rest
+        piece = text[self._emitted:]
+        self._emitted = len(text)
+        if piece:
+            self._queue.put(piece)
+
+    def end(self, error=None):
+        self.finished_at = time.perf_counter()
+        self._queue.put(error if error is not None else _END)
+
+    def cancel(self):
+        """Stop generating for this request; the scheduler drops it at its next step."""
+        if self.finished_at is None:
+            self.cancelled = True
+
+    def __iter__(self):
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Runs on normal exhaustion too, where cancel() is a no-op
+            self.cancel()
+
+
+class _Sequence:
+    def __init__(self, input_ids, max_tokens, temperature, stream):
+        self.input_ids = input_ids
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.stream = stream
+        self.generated = 0
+        self.next_token = None
+
+
+def _legacy(past):
+    # Per-layer (key, value) tensors of shape [batch, heads, seq, head_dim]
+    return past.to_legacy_cache() if hasattr(past, "to_legacy_cache") else past
+
+
+def _left_pad(tensor, length, dim):
+    missing = length - tensor.shape[dim]
+    if missing == 0:
+        return tensor
+    shape = list(tensor.shape)
+    shape[dim] = missing
+    return torch.cat([tensor.new_zeros(shape), tensor], dim=dim)
+
+
+class ContinuousBatcher:
+    def __init__(self, model, tokenizer, max_batch_size=16, prefix_cache=None):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_batch_size = max_batch_size
+        self.prefix_cache = prefix_cache
+        self.eos_token_id = tokenizer.eos_token_id
+        self.pad_token_id = tokenizer.pad_token_id or tokenizer.eos_token_id or 0
+        self.waiting = queue.Queue()
+        self.active = []
+        self.cache = None  # legacy per-layer (key, value) of the active batch
+        self.mask = None   # [batch, seq] attention mask matching the cache
+        self.steps = 0
+        self.batch_tokens = 0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="tgi-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, prompt, max_tokens=256, temperature=0.0):
+        self.start()
+        stream = TokenStream(self.tokenizer)
+        input_ids = self.tokenizer(prompt)["input_ids"]
+        self.waiting.put(_Sequence(input_ids, max_tokens, temperature, stream))
+        return stream
+
+    def stats(self):
+        stats = {
+            "active": len(self.active),
+            "waiting": self.waiting.qsize(),
+            "decode_steps": self.steps,
+            "avg_batch_size": round(self.batch_tokens / self.steps, 2) if self.steps else 0.0,
+        }
+        if self.prefix_cache is not None:
+            stats["prefix_cache"] = self.prefix_cache.stats()
+        return stats
+
+    # ---------- scheduler ----------
+    def _run(self):
+        while True:
+            # Block only when idle; otherwise admit whatever is waiting without stalling decode
+            admitted = [] if self.active else [self.waiting.get()]
+            while len(self.active) + len(admitted) < self.max_batch_size:
+                try:
+                    admitted.append(self.waiting.get_nowait())
+                except queue.Empty:
+                    break
+            admitted = [seq for seq in admitted if not self._dropped(seq)]
+            try:
+                with torch.inference_mode():
+                    if admitted:
+                        self._prefill(admitted)
+                    if self.active:
+                        self._decode()
+            except Exception as exc:
+                for seq in self.active + admitted:
+                    if seq.stream.finished_at is None:
+                        seq.stream.end(exc)
+                self.active, self.cache, self.mask = [], None, None
+
+    def _forward(self, input_ids, mask, past=None):
+        # Explicit positions keep rotary embeddings right for left-padded rows
+        position_ids = (mask.cumsum(-1) - 1).clamp(min=0)[:, -input_ids.shape[1]:]
+        out = self.model(
+            input_ids=input_ids,
+            attention_mask=mask,
+            position_ids=position_ids,
+            past_key_values=DynamicCache.from_legacy_cache(past) if past is not None else None,
+            use_cache=True,
+        )
+        return out.logits[:, -1, :].float(), _legacy(out.past_key_values)
+
+    def _sample(self, logits, seqs):
+        temps = torch.tensor([s.temperature for s in seqs], device=logits.device)
+        greedy = logits.argmax(-1)
+        probs = torch.softmax(logits / temps.clamp(min=1e-5).unsqueeze(1), dim=-1)
+        sampled = torch.multinomial(probs, 1).squeeze(1)
+        return torch.where(temps > 0, sampled, greedy).tolist()
+
+    def _dropped(self, seq):
+        if seq.stream.cancelled:
+            seq.stream.end()
+        return seq.stream.cancelled
+
+    def _emit(self, seqs, tokens):
+        """Push one token per sequence; returns the row indices that keep generating."""
+        keep = []
+        for i, (seq, token) in enumerate(zip(seqs, tokens)):
+            seq.generated += 1
+            if self._dropped(seq):
+                continue
+            if token == self.eos_token_id:
+                seq.stream.end()
+                continue
+            seq.stream.put(token)
+            seq.next_token = token
+            if seq.generated >= seq.max_tokens:
+                seq.stream.end()
+            else:
+                keep.append(i)
+        return keep
+
+    def _select(self, keep):
+        """Drop finished or cancelled rows and any leading columns that are now all padding."""
+        if len(keep) < len(self.active):
+            rows = torch.tensor(keep, device=self.mask.device)
+            self.active = [self.active[i] for i in keep]
+            self.mask = self.mask[rows]
+            self.cache = [(k[rows], v[rows]) for k, v in self.cache]
+        if not self.active:
+            self.cache, self.mask = None, None
+            return
+        first = int(self.mask.any(0).nonzero()[0])
+        if first:
+            self.mask = self.mask[:, first:]
+            self.cache = [(k[:, :, first:], v[:, :, first:]) for k, v in self.cache]
+
+    def _cached_prefixes(self, seqs):
+        """Per sequence, the number of cached prompt tokens and their per-layer (key, value)."""
+        if self.prefix_cache is None:
+            return [(0, None)] * len(seqs)
+        return [self.prefix_cache.match(s.input_ids) for s in seqs]
+
+    def _prefill(self, seqs):
+        device = self.model.device
+        cached = self._cached_prefixes(seqs)
+        # Rows are [pad, cached prefix, pad, uncached suffix]; the mask and explicit
+        # positions make the padding in the middle invisible, as for left padding
+        prefix = max(n for n, _ in cached)
+        length = max(len(s.input_ids) - n for s, (n, _) in zip(seqs, cached))
+        input_ids = torch.full((len(seqs), length), self.pad_token_id, dtype=torch.long)
+        mask = torch.zeros((len(seqs), prefix + length), dtype=torch.long)
+        for i, (seq, (n, _)) in enumerate(zip(seqs, cached)):
+            suffix = seq.input_ids[n:]
+            input_ids[i, length - len(suffix):] = torch.tensor(suffix)
+            mask[i, prefix - n:prefix] = 1
+            mask[i, prefix + length - len(suffix):] = 1
+        input_ids, mask = input_ids.to(device), mask.to(device)
+
+        past = None
+        if prefix:
+            ref = next(layers for _, layers in cached if layers is not None)
+            empty = [(k[:, :0], v[:, :0]) for k, v in ref]
+            rows = [layers if layers is not None else empty for _, layers in cached]
+            past = [
+                tuple(
+                    torch.cat([_left_pad(row[layer][j].unsqueeze(0), prefix, 2) for row in rows])
+                    for j in (0, 1)
+                )
+                for layer in range(len(ref))
+            ]
+
+        logits, cache = self._forward(input_ids, mask, past)
+        if self.prefix_cache is not None:
+            for i, (seq, (n, _)) in enumerate(zip(seqs, cached)):
+                shared = self.prefix_cache.shared(seq.input_ids, n)
+                if shared:
+                    # Only the span shared with an earlier prompt is copied out of the batch
+                    cols = mask[i].nonzero().squeeze(1)[:shared]
+                    layers = [(k[i].index_select(1, cols), v[i].index_select(1, cols))
+                              for k, v in cache]
+                    self.prefix_cache.insert(seq.input_ids[:shared], layers)
+        keep = self._emit(seqs, self._sample(logits, seqs))
+        if not keep:
+            return
+
+        # Merge into the running batch, left-padding whichever cache is shorter
+        rows = torch.tensor(keep, device=device)
+        mask, cache = mask[rows], [(k[rows], v[rows]) for k, v in cache]
+        if self.active:
+            length = max(mask.shape[1], self.mask.shape[1])
+            mask = torch.cat([_left_pad(self.mask, length, 1), _left_pad(mask, length, 1)])
+            cache = [
+                (torch.cat([_left_pad(k0, length, 2), _left_pad(k1, length, 2)]),
+                 torch.cat([_left_pad(v0, length, 2), _left_pad(v1, length, 2)]))
+                for (k0, v0), (k1, v1) in zip(self.cache, cache)
+            ]
+        self.active = self.active + [seqs[i] for i in keep]
+        self.cache, self.mask = cache, mask
+
+    def _decode(self):
+        device = self.model.device
+        input_ids = torch.tensor([[s.next_token] for s in self.active], device=device)
+        self.mask = torch.cat([self.mask, self.mask.new_ones((len(self.active), 1))], dim=1)
+        logits, self.cache = self._forward(input_ids, self.mask, self.cache)
+        self.steps += 1
+        self.batch_tokens += len(self.active)
+        self._select(self._emit(self.active, self._sample(logits, self.active)))
@@ -0,0 +1,78 @@
+# benchmark_local.py
+# Tokens/sec and time-to-first-token for the local backend at 1/4/16 concurrent clients:
+# one model.generate call per request (the previous /chat/local) vs. the continuous batcher.
+#
+#   TGI_MODEL_ID=HuggingFaceTB/SmolLM-135M-Instruct python benchmark_local.py
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from transformers import TextIteratorStreamer
+
+from backend_tgi import batcher, format_prompt, model, tokenizer
+
+PROMPTS = [
+    "Explain machine learning in two sentences.",
+    "Write a haiku about GPUs.",
+    "What is the capital of France?",
+    "List three uses of vector databases.",
+    "Why is the sky blue?",
+    "Give me a tip for writing clean Python code.",
+]
+
+
+def run_generate(prompt, max_tokens):
+    """The previous path: a dedicated generate() call, streamed to measure TTFT."""
+    inputs = tokenizer(format_prompt(prompt), return_tensors="pt").to(model.device)
+    streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+    result = {}
+
+    def generate():
+        result["ids"] = model.generate(
+            **inputs, max_new_tokens=max_tokens, do_sample=False, streamer=streamer
+        )
+
+    start = time.perf_counter()
+    thread = threading.Thread(target=generate)
+    thread.start()
+    ttft = None
+    for _ in streamer:
+        ttft = ttft or time.perf_counter() - start
+    thread.join()
+    return ttft, result["ids"].shape[1] - inputs["input_ids"].shape[1]
+
+
+def run_batched(prompt, max_tokens):
+    stream = batcher.submit(format_prompt(prompt), max_tokens, temperature=0.0)
+    for _ in stream:
+        pass
+    return stream.ttft, len(stream.token_ids)
+
+
+def measure(fn, clients, requests, max_tokens):
+    prompts = [PROMPTS[i % len(PROMPTS)] for i in range(requests)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        results = list(pool.map(lambda p: fn(p, max_tokens), prompts))
+    elapsed = time.perf_counter() - start
+    ttfts = [t for t, _ in results if t is not None]
+    tokens = sum(n for _, n in results)
+    return tokens / elapsed, np.percentile(ttfts, 50) * 1000, np.percentile(ttfts, 95) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local backend throughput and TTFT")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--max-tokens", type=int, default=64)
+    args = parser.parse_args()
+
+    run_batched(PROMPTS[0], 4)  # warm-up
+    print(f"\n{'mode':<10} {'clients':>7} {'tokens/s':>10} {'TTFT p50 ms':>12} {'TTFT p95 ms':>12}")
+    for clients in args.clients:
+        requests = max(2 * clients, 4)
+        for name, fn in [("generate", run_generate), ("batched", run_batched)]:
+            rate, p50, p95 = measure(fn, clients, requests, args.max_tokens)
+            print(f"{name:<10} {clients:>7} {rate:>10.1f} {p50:>12.1f} {p95:>12.1f}")
+    print(f"\nBatcher: {batcher.stats()}")
@@ -0,0 +1,74 @@
+# benchmark_prefix.py
+# Time-to-first-token for prompts sharing a long preamble, with and without the prefix cache.
+#
+#   TGI_MODEL_ID=HuggingFaceTB/SmolLM-135M-Instruct python benchmark_prefix.py --prefix-tokens 1024
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from backend_tgi import format_prompt, model, tokenizer
+from batching import ContinuousBatcher
+from prefix_cache import PrefixCache
+
+POLICY = (
+    "You are a support assistant for an online electronics store. Answer politely and "
+    "concisely. Orders ship within two business days. Returns are accepted within 30 days "
+    "of delivery if the item is unused and in its original packaging. Refunds go back to "
+    "the original payment method within five business days of the return being received. "
+)
+QUESTIONS = [
+    "Can I return headphones I opened last week?",
+    "How long does shipping take?",
+    "When will I get my refund?",
+    "Do you ship internationally?",
+    "My laptop arrived damaged, what should I do?",
+    "Can I change the delivery address of my order?",
+    "Is there a warranty on televisions?",
+    "How do I track my package?",
+]
+
+
+def build_preamble(tokens):
+    preamble = POLICY
+    while len(tokenizer(preamble)["input_ids"]) < tokens:
+        preamble += POLICY
+    return preamble
+
+
+def run(batcher, prompts, clients, max_tokens):
+    def one(prompt):
+        stream = batcher.submit(prompt, max_tokens, temperature=0.0)
+        for _ in stream:
+            pass
+        return stream.ttft
+
+    with ThreadPoolExecutor(clients) as pool:
+        return [t for t in pool.map(one, prompts) if t is not None]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TTFT with a shared prompt prefix")
+    parser.add_argument("--prefix-tokens", type=int, default=1024)
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--clients", type=int, default=1)
+    parser.add_argument("--max-tokens", type=int, default=16)
+    parser.add_argument("--cache-mb", type=int, default=1024)
+    args = parser.parse_args()
+
+    preamble = build_preamble(args.prefix_tokens)
+    prompts = [format_prompt(QUESTIONS[i % len(QUESTIONS)], preamble)
+               for i in range(args.requests)]
+    print(f"Shared prefix: {len(tokenizer(preamble)['input_ids'])} tokens, "
+          f"{args.requests} requests, {args.clients} client(s)")
+
+    print(f"\n{'prefix cache':<13} {'TTFT p50 ms':>12} {'TTFT p95 ms':>12} {'hit rate':>9}")
+    for name, cache in [("off", None), ("on", PrefixCache(args.cache_mb * 2**20))]:
+        batcher = ContinuousBatcher(model, tokenizer, prefix_cache=cache)
+        run(batcher, [format_prompt("Hello")], 1, 4)  # warm-up, without the shared prefix
+        ttfts = np.array(run(batcher, prompts, args.clients, args.max_tokens)) * 1000
+        hit_rate = f"{cache.stats()['hit_rate']:.2f}" if cache else "-"
+        print(f"{name:<13} {np.percentile(ttfts, 50):>12.1f} {np.percentile(ttfts, 95):>12.1f} "
+              f"{hit_rate:>9}")
+    if cache:
+        print(f"\nPrefix cache: {cache.stats()}")
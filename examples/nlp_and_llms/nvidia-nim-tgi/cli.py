@@ -1,5 +1,5 @@
 import argparse
-from backend_tgi import tgi_chat
+from backend_tgi import tgi_chat_stream
 from backend_nim import nim_chat
 
 parser = argparse.ArgumentParser(description="NIM/TGI CLI")
@@ -10,7 +10,9 @@ args = parser.parse_args()
 
 if args.backend == "local":
     print("\n🟢 Local TGI Response:")
-    print(tgi_chat(args.prompt))
+    for chunk in tgi_chat_stream(args.prompt):
+        print(chunk, end="", flush=True)
+    print("\n")
 
 else:
     print("\n🟢 NVIDIA NIM Response:")
@@ -0,0 +1,89 @@
+"""
+Minimal OpenAI-compatible chat server for exercising backend_nim.py offline.
+
+    MOCK_LATENCY=0.5 MOCK_FAILURE_RATE=0.2 uvicorn mock_openai:app --port 9000
+    NIM_BASE_URL=http://localhost:9000/v1 NVIDIA_API_KEY=mock uvicorn server:app --port 8000
+
+Each completion echoes the prompt after MOCK_LATENCY seconds, streamed word
+by word when requested. A MOCK_FAILURE_RATE share of requests gets a 429 or
+503 instead, to exercise retries.
+"""
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+LATENCY = float(os.getenv("MOCK_LATENCY", "0.5"))
+FAILURE_RATE = float(os.getenv("MOCK_FAILURE_RATE", "0"))
+TOKEN_DELAY = float(os.getenv("MOCK_TOKEN_DELAY", "0.02"))
+
+app = FastAPI(title="Mock OpenAI-compatible server")
+stats = {"requests": 0, "failures": 0, "in_flight": 0, "max_in_flight": 0}
+
+
+def chunk(completion_id, model, delta, finish_reason=None):
+    return {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    stats["requests"] += 1
+    if random.random() < FAILURE_RATE:
+        stats["failures"] += 1
+        status = random.choice([429, 503])
+        return JSONResponse({"error": {"message": f"mock {status}"}}, status_code=status)
+
+    model = body.get("model", "mock")
+    prompt = body["messages"][-1]["content"]
+    words = f"Echo: {prompt}".split(" ")
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+
+    stats["in_flight"] += 1
+    stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+    try:
+        await asyncio.sleep(LATENCY)
+    finally:
+        stats["in_flight"] -= 1
+
+    if body.get("stream"):
+        async def events():
+            yield f"data: {json.dumps(chunk(completion_id, model, {'role': 'assistant'}))}\n\n"
+            for i, word in enumerate(words):
+                await asyncio.sleep(TOKEN_DELAY)
+                piece = word if i == 0 else f" {word}"
+                yield f"data: {json.dumps(chunk(completion_id, model, {'content': piece}))}\n\n"
+            yield f"data: {json.dumps(chunk(completion_id, model, {}, 'stop'))}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": " ".join(words)},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": len(prompt.split()), "completion_tokens": len(words),
+                  "total_tokens": len(prompt.split()) + len(words)},
+    }
+
+
+@app.get("/stats")
+def get_stats():
+    return stats
@@ -0,0 +1,138 @@
+"""
+Prefix cache for the local backend: reuses the KV cache of earlier prompts.
+
+Prompts are split into blocks of `block_size` tokens, and each block gets a
+hash chained from the blocks before it. The hash of block i therefore stands
+for the whole prefix up to that block. A lookup is one dict probe per block,
+whatever the number of entries. The keys and values of a matched prefix are
+exactly what prefill would compute again, because attention is causal. Only
+the remaining tokens are run through the model.
+
+Copying keys and values out of the batch costs time on the scheduler thread,
+so only prefixes that recur are cached. The cache remembers the block hashes
+of recent prompts. When a prompt shares blocks with an earlier one, for
+example a common system prompt, just that shared span is stored.
+
+Entries are evicted least-recently-used first once their total size exceeds
+the memory budget.
+"""
+from collections import OrderedDict
+
+
+def _block_hashes(input_ids, block_size, limit):
+    """Chained hashes of the full blocks within the first limit tokens."""
+    hashes, h = [], None
+    for start in range(0, limit - block_size + 1, block_size):
+        h = hash((h, tuple(input_ids[start:start + block_size])))
+        hashes.append(h)
+    return hashes
+
+
+def _nbytes(layers):
+    return sum(t.numel() * t.element_size() for kv in layers for t in kv)
+
+
+class PrefixCache:
+    def __init__(self, max_bytes, block_size=16, max_seen=1 << 16):
+        self.max_bytes = max_bytes
+        self.block_size = block_size  # also the shortest prefix worth an extra cache copy
+        self.max_seen = max_seen
+        # hash of an entry's last block -> (token ids, per-layer (key, value), [heads, seq, dim])
+        self.entries = OrderedDict()
+        self.blocks = {}  # block hash -> keys of the entries containing that prefix
+        self.seen = OrderedDict()  # block hashes of recent prompts, cached or not
+        self.hashes = {}
+        self.sizes = {}
+        self.bytes = 0
+        self.lookups = 0
+        self.hits = 0
+        self.prompt_tokens = 0
+        self.reused_tokens = 0
+
+    def _hashes(self, input_ids):
+        # At least one token is always left uncached, since prefill needs its logits
+        return _block_hashes(input_ids, self.block_size, len(input_ids) - 1)
+
+    def match(self, input_ids):
+        """Returns (n, layers): the cached keys/values of the first n prompt tokens."""
+        self.lookups += 1
+        self.prompt_tokens += len(input_ids)
+        blocks, last = 0, None
+        for h in self._hashes(input_ids):
+            if h not in self.blocks:
+                break
+            blocks, last = blocks + 1, h
+        if not blocks:
+            return 0, None
+        n = blocks * self.block_size
+        key = next(iter(self.blocks[last]))
+        tokens, layers = self.entries[key]
+        if tokens[:n] != tuple(input_ids[:n]):
+            return 0, None  # hash collision
+        self.entries.move_to_end(key)
+        self.hits += 1
+        self.reused_tokens += n
+        return n, [(k[:, :n], v[:, :n]) for k, v in layers]
+
+    def shared(self, input_ids, cached=0):
+        """Length of the prefix this prompt shares with an earlier one, if more than cached.
+
+        Records the prompt's blocks as seen, so the next prompt starting the same way
+        gets its shared span cached.
+        """
+        hashes = self._hashes(input_ids)
+        blocks = 0
+        for h in hashes:
+            if h not in self.seen:
+                break
+            blocks += 1
+        for h in hashes:
+            self.seen[h] = None
+            self.seen.move_to_end(h)
+        while len(self.seen) > self.max_seen:
+            self.seen.popitem(last=False)
+        n = blocks * self.block_size
+        return n if n > cached else 0
+
+    def insert(self, input_ids, layers):
+        """Caches the keys/values of input_ids, a whole number of blocks long."""
+        tokens = tuple(input_ids)
+        hashes = _block_hashes(tokens, self.block_size, len(tokens))
+        size = _nbytes(layers)
+        if not hashes or size > self.max_bytes:
+            return
+        key = hashes[-1]
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return
+        # Entries that are a prefix of this one are now redundant
+        for h in hashes[:-1]:
+            if h in self.entries:
+                self._evict(h)
+        self.entries[key] = (tokens, layers)
+        self.hashes[key] = hashes
+        for h in hashes:
+            self.blocks.setdefault(h, set()).add(key)
+        self.sizes[key] = size
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            self._evict(next(iter(self.entries)))
+
+    def _evict(self, key):
+        del self.entries[key]
+        for h in self.hashes.pop(key):
+            keys = self.blocks[h]
+            keys.discard(key)
+            if not keys:
+                del self.blocks[h]
+        self.bytes -= self.sizes.pop(key)
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "memory_mb": round(self.bytes / 2**20, 1),
+            "hit_rate": round(self.hits / self.lookups, 3) if self.lookups else 0.0,
+            "reused_token_ratio": (
+                round(self.reused_tokens / self.prompt_tokens, 3) if self.prompt_tokens else 0.0
+            ),
+        }
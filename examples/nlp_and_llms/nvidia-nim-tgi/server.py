@@ -1,26 +1,93 @@
+import json
+
+import time
+
 from fastapi import FastAPI, Form
 from fastapi.responses import StreamingResponse, JSONResponse
-from backend_tgi import tgi_chat
-from backend_nim import nim_chat
+from pydantic import BaseModel, Field
+from backend_tgi import batcher, tgi_chat, tgi_chat_stream
+from backend_nim import nim
 
 app = FastAPI(title="NIM / TGI Drop-in API Server")
 
+def sse(pieces):
+    # One event per text piece, then an explicit end marker
+    try:
+        for piece in pieces:
+            yield f"data: {json.dumps({'token': piece})}\n\n"
+    finally:
+        # Closed early when the client disconnects: free the batch slot
+        pieces.cancel()
+    yield "data: [DONE]\n\n"
+
+
+async def sse_async(pieces):
+    try:
+        async for piece in pieces:
+            yield f"data: {json.dumps({'token': piece})}\n\n"
+    except Exception as exc:
+        # Headers are already sent, so report the failure in-band
+        yield f"data: {json.dumps({'error': f'{type(exc).__name__}: {exc}'})}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+class BatchChatRequest(BaseModel):
+    prompts: list[str] = Field(min_length=1, max_length=256)
+    max_tokens: int = 1024
+    temperature: float = 0.6
+
+
 @app.post("/chat/local")
-def chat_local(prompt: str = Form(...)):
-    response = tgi_chat(prompt)
+def chat_local(
+    prompt: str = Form(...),
+    stream: bool = Form(False),
+    max_tokens: int = Form(256),
+    temperature: float = Form(0.0),
+):
+    if stream:
+        pieces = tgi_chat_stream(prompt, max_tokens, temperature)
+        return StreamingResponse(sse(pieces), media_type="text/event-stream")
+
+    response = tgi_chat(prompt, max_tokens, temperature)
     return {"backend": "tgi-local", "response": response}
 
 
+@app.get("/chat/local/stats")
+def chat_local_stats():
+    return batcher.stats()
+
+
 @app.post("/chat/nim")
-def chat_nim(prompt: str = Form(...), stream: bool = False):
+async def chat_nim(prompt: str = Form(...), stream: bool = Form(False)):
     if stream:
-        generator = nim_chat(prompt, stream=True)
-        return StreamingResponse(generator, media_type="text/event-stream")
+        pieces = nim.chat_stream(prompt)
+        return StreamingResponse(sse_async(pieces), media_type="text/event-stream")
 
-    response = nim_chat(prompt, stream=False)
+    response = await nim.chat(prompt)
     return {"backend": "nvidia-nim", "response": response}
 
 
+@app.post("/chat/nim/batch")
+async def chat_nim_batch(request: BatchChatRequest):
+    start = time.perf_counter()
+    results = await nim.chat_batch(
+        request.prompts, max_tokens=request.max_tokens, temperature=request.temperature
+    )
+    return {
+        "backend": "nvidia-nim",
+        "results": results,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+@app.on_event("shutdown")
+async def close_nim():
+    await nim.aclose()
+
+
 @app.get("/")
 def root():
-    return {"message": "NIM/TGI Server Running", "endpoints": ["/chat/local", "/chat/nim"]}
+    return {
+        "message": "NIM/TGI Server Running",
+        "endpoints": ["/chat/local", "/chat/nim", "/chat/nim/batch"],
+    }
@@ -0,0 +1,75 @@
+# benchmark_indexing.py
+# Indexing throughput on a synthetic corpus: the old one-document-at-a-time loop
+# vs. batched encode + bulk add, then an incremental resync after a few edits.
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from rag_machine import client, embedder, index_documents, load_all_documents
+
+N_DOCS = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+WORDS = "saturn cloud gpu cluster dask notebook deployment job model data pipeline".split()
+
+
+def write_corpus(data_dir: Path, n_docs: int):
+    rng = random.Random(42)
+    for i in range(n_docs):
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(50, 300)))
+        (data_dir / f"doc_{i:05d}.txt").write_text(text, encoding="utf-8")
+
+
+def fresh_collection(name):
+    try:
+        client.delete_collection(name)
+    except Exception:
+        pass
+    return client.create_collection(name)
+
+
+def legacy_index(data_dir: Path, store):
+    # The previous index_documents: one encode() and one add() per document
+    for i, d in enumerate(load_all_documents(data_dir)):
+        emb = embedder.encode(d["text"])
+        store.add(
+            ids=[str(i)],
+            documents=[d["text"]],
+            embeddings=[emb.tolist()],
+            metadatas=[{"source": d["file"]}],
+        )
+
+
+def timed(label, n_docs, fn, *args, **kwargs):
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    results.append((label, n_docs, elapsed))
+
+
+results = []
+with tempfile.TemporaryDirectory() as tmp:
+    data_dir = Path(tmp)
+    write_corpus(data_dir, N_DOCS)
+
+    timed("per-document loop", N_DOCS, legacy_index, data_dir, fresh_collection("bench_legacy"))
+
+    store = fresh_collection("bench_batched")
+    timed("batched full build", N_DOCS, index_documents, data_dir=data_dir, store=store)
+    timed("resync, nothing changed", N_DOCS, index_documents, data_dir=data_dir, store=store)
+
+    # Edit 1% of the files, delete 1%, and resync
+    files = sorted(data_dir.glob("*.txt"))
+    n_edit = max(1, N_DOCS // 100)
+    for file in files[:n_edit]:
+        file.write_text(file.read_text() + " updated", encoding="utf-8")
+    for file in files[-n_edit:]:
+        file.unlink()
+    timed("resync, 1% edited + 1% deleted", N_DOCS, index_documents, data_dir=data_dir, store=store)
+
+    client.delete_collection("bench_legacy")
+    client.delete_collection("bench_batched")
+
+print(f"\n{'run':<32} {'seconds':>9} {'docs/sec':>10}")
+for label, n_docs, elapsed in results:
+    print(f"{label:<32} {elapsed:>9.2f} {n_docs / elapsed:>10.1f}")
@@ -0,0 +1,72 @@
+# benchmark_query.py
+# Load test for a running `uvicorn rag-api:app`: a repeated-question workload
+# (served from the answer cache after the first generation) vs. unique questions,
+# while a probe measures /health latency under that load.
+import json
+import statistics
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+URL = sys.argv[1] if len(sys.argv) > 1 else "http://127.0.0.1:8000"
+N_REQUESTS = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+CLIENTS = 16
+QUESTIONS = [
+    "What is this project about?",
+    "How do I deploy the API on Saturn Cloud?",
+    "Which models are used for embeddings and answers?",
+    "How do I reset the vector database?",
+]
+
+
+def post(path, payload):
+    request = urllib.request.Request(
+        URL + path,
+        data=json.dumps(payload).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)
+
+
+def probe_health(latencies, stop):
+    while not stop.is_set():
+        start = time.perf_counter()
+        urllib.request.urlopen(URL + "/health").read()
+        latencies.append(time.perf_counter() - start)
+        time.sleep(0.05)
+
+
+def run(label, questions):
+    def ask(question):
+        start = time.perf_counter()
+        cached = post("/query", {"query": question})["cached"]
+        return time.perf_counter() - start, cached
+
+    health, stop = [], threading.Event()
+    prober = threading.Thread(target=probe_health, args=(health, stop))
+    prober.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(CLIENTS) as pool:
+        results = list(pool.map(ask, questions))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    prober.join()
+
+    latencies = sorted(seconds for seconds, _ in results)
+    hits = sum(cached for _, cached in results)
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    health_ms = statistics.median(health) * 1000 if health else float("nan")
+    print(
+        f"{label:<20} {len(questions) / elapsed:>8.1f} {p50:>9.1f} {p99:>9.1f} "
+        f"{hits:>6}/{len(questions):<4} {health_ms:>10.1f}"
+    )
+
+
+print(f"{'workload':<20} {'req/s':>8} {'p50 ms':>9} {'p99 ms':>9} {'cached':>11} {'health ms':>10}")
+repeated = [QUESTIONS[i % len(QUESTIONS)] for i in range(N_REQUESTS)]
+run("unique questions", [f"{question} (variant {i})" for i, question in enumerate(repeated)])
+run("repeated questions", repeated)
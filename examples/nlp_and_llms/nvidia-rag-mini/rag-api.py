@@ -1,17 +1,140 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
 from fastapi import FastAPI
 from pydantic import BaseModel
-from rag_machine import query_docs, index_documents
+
+import rag_machine
+from rag_machine import generate_answer, index_documents, retrieve
+
+# Generations running at once; extra questions wait in the executor queue
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "300"))  # seconds
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1024"))
 
 app = FastAPI(title="RAG Mini Docs Q&A")
+executor = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix="rag-llm")
+
+
+class AnswerCache:
+    """LRU of (index version, question, retrieved ids) -> answer, with a TTL.
+
+    Entries from an older index version are dropped as soon as the index changes.
+    Only touched from the event loop, so it needs no lock.
+    """
+
+    def __init__(self, ttl, maxsize):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.version = rag_machine.index_version
+        self._entries = OrderedDict()
+
+    def _sync_version(self):
+        if self.version != rag_machine.index_version:
+            self._entries.clear()
+            self.version = rag_machine.index_version
+
+    def get(self, key):
+        self._sync_version()
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._sync_version()
+        if key[0] != self.version:
+            return  # generated against an index that has since changed
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+answers = AnswerCache(ANSWER_CACHE_TTL, ANSWER_CACHE_SIZE)
+# Generations in progress, so identical concurrent questions share one
+inflight = {}
+
 
 class QueryRequest(BaseModel):
     query: str
 
+
 @app.on_event("startup")
 def startup_event():
     index_documents(reindex=False)
 
+
+@app.on_event("shutdown")
+def shutdown_event():
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _finish(key, future):
+    inflight.pop(key, None)
+    if not future.cancelled() and future.exception() is None:
+        answers.put(key, future.result())
+
+
+async def answer_question(question: str):
+    loop = asyncio.get_running_loop()
+    version = rag_machine.index_version
+    # Retrieval is quick (the query embedding is cached), so it stays off the LLM executor
+    ids, chunks = await loop.run_in_executor(None, retrieve, question)
+    if not chunks:
+        return {"answer": "No relevant documents found.", "prompt_tokens": 0, "chunks": []}, False
+
+    key = (version, question, tuple(ids))
+    cached = answers.get(key)
+    if cached is not None:
+        return cached, True
+
+    future = inflight.get(key)
+    if future is None:
+        future = loop.run_in_executor(executor, generate_answer, question, ids, chunks)
+        inflight[key] = future
+        future.add_done_callback(lambda f: _finish(key, f))
+    # Shielded: a client disconnecting must not cancel a generation others are waiting on
+    return await asyncio.shield(future), False
+
+
 @app.post("/query")
-def query(req: QueryRequest):
-    answer = query_docs(req.query)
-    return {"result": answer}
+async def query(req: QueryRequest):
+    # Normalize whitespace so trivially different spellings share cache entries
+    details, cached = await answer_question(" ".join(req.query.split()))
+    return {
+        "result": details["answer"],
+        "prompt_tokens": details["prompt_tokens"],
+        "sources": details["chunks"],
+        "cached": cached,
+    }
+
+
+@app.post("/reload")
+async def reload():
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, index_documents)
+    return {"status": "ok", "index_version": rag_machine.index_version}
+
+
+@app.get("/health")
+async def health():
+    # Never touches the models, so it answers even while every generation slot is busy
+    return {
+        "status": "ok",
+        "index_version": rag_machine.index_version,
+        "inflight": len(inflight),
+        "cached_answers": len(answers),
+        "embedding_cache": rag_machine.embed_query.cache_info()._asdict(),
+    }
@@ -1,5 +1,7 @@
 # rag_machine.py
+from functools import lru_cache
 from pathlib import Path
+import hashlib
 import os
 import torch
 from sentence_transformers import SentenceTransformer
@@ -13,6 +15,12 @@ CHROMA_DIR = "rag_chroma_store"
 DATA_DIR = Path("data")
 EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 LLM_MODEL = "google/flan-t5-base"
+EMBED_BATCH_SIZE = 128  # texts per SentenceTransformer forward pass
+CHUNK_SIZE = 800        # characters per chunk
+CHUNK_OVERLAP = 100     # characters shared by neighbouring chunks
+RETRIEVE_K = 8          # chunks fetched per question before packing
+MAX_INPUT_TOKENS = 512  # flan-t5 input budget (capped by the tokenizer's own limit)
+QUERY_CACHE_SIZE = 1024  # query embeddings kept in the LRU cache
 
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
@@ -29,10 +37,18 @@ llm = AutoModelForSeq2SeqLM.from_pretrained(LLM_MODEL)
 
 client = chromadb.PersistentClient(path=CHROMA_DIR)
 collection = client.get_or_create_collection("rag_docs")
+# Largest add() Chroma accepts in one call
+MAX_ADD_BATCH = getattr(client, "get_max_batch_size", lambda: 5000)()
+# Bumped whenever index_documents changes the collection, so callers can drop cached answers
+index_version = 0
 
 # --------------------------
 # 📚 Document Loader
 # --------------------------
+def file_hash(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
 def load_all_documents(data_dir: Path):
     docs = []
     for file in data_dir.glob("*.txt"):
@@ -43,58 +59,196 @@ def load_all_documents(data_dir: Path):
                 print(f"📄 Loaded: {file.name}")
     return docs
 
+# --------------------------
+# ✂️ Chunking
+# --------------------------
+def chunk_text(text: str, size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP):
+    """Split text into overlapping (start, end, chunk) windows, breaking on whitespace."""
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        if end < len(text):
+            # Prefer to end on whitespace in the second half of the window
+            cut = max(text.rfind(ws, start + size // 2, end) for ws in " \n\t")
+            if cut != -1:
+                end = cut
+        if text[start:end].strip():
+            chunks.append((start, end, text[start:end].strip()))
+        if end == len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return chunks
+
 # --------------------------
 # 🔢 Index Documents
 # --------------------------
-def index_documents(reindex: bool = False):
-    """Rebuild or load existing document embeddings."""
+def clear_collection(store):
+    ids = store.get()["ids"]
+    if ids:
+        store.delete(ids=ids)
+        print("🧹 Cleared existing collection.")
+
+
+def add_in_batches(store, ids, texts, embeddings, metadatas):
+    """Bulk-add to Chroma, split only as much as the max batch size requires."""
+    for start in range(0, len(ids), MAX_ADD_BATCH):
+        end = start + MAX_ADD_BATCH
+        store.add(
+            ids=ids[start:end],
+            documents=texts[start:end],
+            embeddings=embeddings[start:end].tolist(),
+            metadatas=metadatas[start:end],
+        )
+
+
+def index_documents(reindex: bool = False, data_dir: Path = DATA_DIR, store=None):
+    """Sync the collection with data_dir.
+
+    Only new or changed files (by SHA-256) are re-embedded and vectors for
+    removed files are deleted. reindex=True rebuilds everything from scratch.
+    """
+    global index_version
+    store = store if store is not None else collection
     if reindex:
         print("♻️ Reindexing documents...")
-        try:
-            collection.reset()
-            print("🧹 Cleared existing collection.")
-        except AttributeError:
-            ids = collection.get()["ids"]
-            if ids:
-                collection.delete(ids=ids)
-                print("🧹 Deleted existing documents manually.")
-
-        docs = load_all_documents(DATA_DIR)
-        for i, d in enumerate(docs):
-            emb = embedder.encode(d["text"])
-            collection.add(
-                ids=[str(i)],
-                documents=[d["text"]],
-                embeddings=[emb.tolist()],
-                metadatas=[{"source": d["file"]}],
-            )
-        print("✅ Documents reindexed and stored in Chroma.")
-    else:
-        print("📦 Using existing Chroma store.")
+        clear_collection(store)
+
+    # What is indexed now: source file -> (content hash + chunking, vector ids)
+    indexed = {}
+    existing = store.get(include=["metadatas"])
+    for vid, meta in zip(existing["ids"], existing["metadatas"]):
+        signature = f"{meta.get('sha256')}:{meta.get('chunking')}"
+        indexed.setdefault(meta["source"], (signature, []))[1].append(vid)
+
+    # Changing the chunk parameters also invalidates a file's vectors
+    chunking = f"{CHUNK_SIZE}/{CHUNK_OVERLAP}"
+    current = {file.name: file for file in data_dir.glob("*.txt")}
+    hashes = {name: f"{file_hash(file)}:{chunking}" for name, file in current.items()}
+
+    stale = [name for name in indexed if name not in current or indexed[name][0] != hashes[name]]
+    changed = [name for name in current if name not in indexed or indexed[name][0] != hashes[name]]
+
+    stale_ids = [vid for name in stale for vid in indexed[name][1]]
+    if stale_ids:
+        store.delete(ids=stale_ids)
+
+    ids, texts, metadatas = [], [], []
+    for name in changed:
+        text = current[name].read_text(encoding="utf-8")
+        sha256 = hashes[name].split(":")[0]
+        for i, (start, end, chunk) in enumerate(chunk_text(text)):
+            ids.append(f"{name}:{i}")
+            texts.append(chunk)
+            metadatas.append({
+                "source": name,
+                "sha256": sha256,
+                "chunking": chunking,
+                "chunk": i,
+                "start": start,
+                "end": end,
+            })
+
+    if texts:
+        print(f"🔢 Embedding {len(texts)} chunks from {len(changed)} new or changed documents...")
+        embeddings = embedder.encode(
+            texts, batch_size=EMBED_BATCH_SIZE, convert_to_numpy=True, show_progress_bar=False
+        )
+        add_in_batches(store, ids, texts, embeddings, metadatas)
+
+    if reindex or stale_ids or texts:
+        index_version += 1
+
+    removed = len([name for name in stale if name not in current])
+    print(
+        f"✅ Index synced: {len(changed)} documents embedded ({len(texts)} chunks), "
+        f"{removed} removed, {len(current) - len(changed)} unchanged."
+    )
 
 
 # --------------------------
 # 🔍 Query System
 # --------------------------
-def query_docs(question: str, top_k: int = 3):
-    """Retrieve top-k relevant docs and generate an answer."""
-    print(f"\n🔍 Question: {question}")
+PROMPT_TEMPLATE = "Answer based on the following context:\n{context}\n\nQuestion: {question}"
+TOKEN_LIMIT = min(MAX_INPUT_TOKENS, tokenizer.model_max_length)
+
+
+def count_tokens(text: str) -> int:
+    return len(tokenizer(text, add_special_tokens=False)["input_ids"])
+
+
+def pack_context(question: str, chunks):
+    """Greedily fill the token budget with chunks in score order.
+
+    Chunks that don't fit are skipped (a smaller, lower-ranked one may still fit),
+    so the prompt never needs truncation. Returns (prompt, used chunk indices).
+    """
+    # Tokens taken by the template, the question and the end-of-sequence token
+    scaffold = PROMPT_TEMPLATE.format(context="", question=question)
+    budget = TOKEN_LIMIT - len(tokenizer(scaffold)["input_ids"])
+    separator = count_tokens("\n")
+
+    used, used_tokens = [], 0
+    for i, chunk in enumerate(chunks):
+        cost = count_tokens(chunk) + (separator if used else 0)
+        if used_tokens + cost <= budget:
+            used.append(i)
+            used_tokens += cost
+
+    # Token counts of pieces can differ slightly from the joined text; trim until it fits
+    while True:
+        context = "\n".join(chunks[i] for i in used)
+        prompt = PROMPT_TEMPLATE.format(context=context, question=question)
+        if len(tokenizer(prompt)["input_ids"]) <= TOKEN_LIMIT or not used:
+            return prompt, used
+        used.pop()
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def embed_query(question: str):
+    """Embedding of a question; repeated questions skip the encoder."""
+    # A tuple so the cached value can't be mutated by a caller
+    return tuple(embedder.encode(question).tolist())
+
+
+def retrieve(question: str, top_k: int = RETRIEVE_K):
+    """Return the ids and texts of the top-k chunks, best-first."""
+    results = collection.query(query_embeddings=[list(embed_query(question))], n_results=top_k)
+    if not results["documents"] or not results["documents"][0]:
+        return [], []
+    return results["ids"][0], results["documents"][0]
 
-    # Embed the query and search
-    q_emb = embedder.encode(question).tolist()
-    results = collection.query(query_embeddings=[q_emb], n_results=top_k)
 
-    if not results["documents"]:
-        return "No relevant documents found."
+def generate_answer(question: str, ids, chunks):
+    """Pack as many retrieved chunks as fit into the prompt and run the LLM."""
+    prompt, used = pack_context(question, chunks)
 
-    context = "\n".join(results["documents"][0])
-    prompt = f"Answer based on the following context:\n{context}\n\nQuestion: {question}"
+    # Packing keeps the prompt within the limit; truncation only guards an overlong question
+    inputs = tokenizer(prompt, return_tensors="pt", truncation=True, max_length=TOKEN_LIMIT)
+    prompt_tokens = inputs["input_ids"].shape[1]
+    print(f"🧮 Prompt: {prompt_tokens}/{TOKEN_LIMIT} tokens, {len(used)}/{len(chunks)} chunks")
+
+    with torch.inference_mode():
+        outputs = llm.generate(**inputs, max_length=512)
+    return {
+        "answer": tokenizer.decode(outputs[0], skip_special_tokens=True),
+        "prompt_tokens": prompt_tokens,
+        "token_limit": TOKEN_LIMIT,
+        "chunks": [ids[i] for i in used],
+    }
+
+
+def query_docs(question: str, top_k: int = RETRIEVE_K, return_details: bool = False):
+    """Retrieve the top-k chunks, pack as many as fit into the prompt and generate an answer."""
+    print(f"\n🔍 Question: {question}")
 
-    inputs = tokenizer(prompt, return_tensors="pt", truncation=True)
-    outputs = llm.generate(**inputs, max_length=512)
-    answer = tokenizer.decode(outputs[0], skip_special_tokens=True)
+    ids, chunks = retrieve(question, top_k)
+    if not chunks:
+        answer = "No relevant documents found."
+        return {"answer": answer, "prompt_tokens": 0, "chunks": []} if return_details else answer
 
-    return answer
+    details = generate_answer(question, ids, chunks)
+    return details if return_details else details["answer"]
 
 # --------------------------
 # 🧪 CLI Test Mode
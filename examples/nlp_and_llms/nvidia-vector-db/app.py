@@ -1,6 +1,6 @@
 from fastapi import FastAPI
-from pydantic import BaseModel
-from vectordb import search
+from pydantic import BaseModel, Field
+from vectordb import search, search_batch
 
 app = FastAPI(title="RAG Vector DB Compare API")
 
@@ -17,3 +17,20 @@ def search_vectors(req: QueryRequest):
         "query": req.query,
         "results": [r.page_content[:400] for r in results]
     }
+
+class BatchQueryRequest(BaseModel):
+    db: str  # faiss | milvus | pgvector
+    queries: list[str] = Field(min_length=1, max_length=256)
+    k: int = 3
+
+@app.post("/search_batch")
+def search_vectors_batch(req: BatchQueryRequest):
+    # One embedding forward pass and one multi-vector search for all queries
+    results = search_batch(req.db.lower(), req.queries, req.k)
+    return {
+        "db": req.db,
+        "results": [
+            {"query": query, "results": [r.page_content[:400] for r in docs]}
+            for query, docs in zip(req.queries, results)
+        ],
+    }
@@ -0,0 +1,52 @@
+"""
+Throughput of /search_batch vs one /search call per query.
+
+Runs the same queries through vectordb.search (one embedding pass and one
+search per query) and vectordb.search_batch in batches of 1, 8 and 64, and
+reports queries/sec and the speedup over the one-at-a-time path.
+
+    python benchmark_batch.py --backends faiss milvus pgvector --queries 256
+"""
+import argparse
+import time
+
+from benchmark import query_texts
+from vectordb import BACKENDS, get_corpus, get_store, search, search_batch
+
+
+def timed(fn, queries, *args):
+    start = time.perf_counter()
+    fn(queries, *args)
+    return len(queries) / (time.perf_counter() - start)
+
+
+def one_by_one(queries, db, k):
+    for query in queries:
+        search(db, query, k)
+
+
+def batched(queries, db, k, batch_size):
+    for start in range(0, len(queries), batch_size):
+        search_batch(db, queries[start:start + batch_size], k)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batched vs single-query search throughput")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=["faiss"])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--queries", type=int, default=256)
+    parser.add_argument("--k", type=int, default=3)
+    args = parser.parse_args()
+
+    queries = query_texts(get_corpus(), args.queries)
+    print(f"\n{'backend':<10} {'mode':<12} {'queries/s':>10} {'speedup':>8}")
+    for db in args.backends:
+        get_store(db)
+        # Warm up the model and the connection before timing
+        search_batch(db, queries[:8], args.k)
+
+        baseline = timed(one_by_one, queries, db, args.k)
+        print(f"{db:<10} {'/search':<12} {baseline:>10.1f} {1:>7.2f}x")
+        for batch_size in args.batch_sizes:
+            rate = timed(batched, queries, db, args.k, batch_size)
+            print(f"{db:<10} {f'batch {batch_size}':<12} {rate:>10.1f} {rate / baseline:>7.2f}x")
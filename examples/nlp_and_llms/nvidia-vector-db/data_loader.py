@@ -1,14 +1,103 @@
+import hashlib
+import json
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
 from datasets import load_dataset
+from huggingface_hub import HfApi
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
+DATASET = "jsulz/state-of-the-union-addresses"
+# Pin a commit sha for reproducible indexes; "main" follows the latest upload
+DATASET_REVISION = os.getenv("DATASET_REVISION", "main")
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+# Chunk ids are "<first 16 hex of the speech's sha256>:<start offset>", so they stay the same
+# across runs and dataset revisions for any speech whose text didn't change
+CHUNK_ID_SCHEME = "sha256[:16]:start"
+# Last sha each revision name resolved to, so the cache key survives going offline
+REVISIONS_FILE = os.path.join(os.getenv("VECTOR_CACHE_DIR", ".vector_cache"), "revisions.json")
+
+_splitter = None
+
+
+def _read_revisions():
+    try:
+        with open(REVISIONS_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def dataset_revision():
+    """Resolve DATASET_REVISION to a commit sha, so a new upload changes the cache key."""
+    name = f"{DATASET}@{DATASET_REVISION}"
+    revisions = _read_revisions()
+    try:
+        sha = HfApi().dataset_info(DATASET, revision=DATASET_REVISION).sha
+    except Exception:
+        # Offline (or the Hub is unreachable): reuse the sha it resolved to last time
+        return revisions.get(name, DATASET_REVISION)
+    if revisions.get(name) != sha:
+        revisions[name] = sha
+        os.makedirs(os.path.dirname(REVISIONS_FILE) or ".", exist_ok=True)
+        with open(REVISIONS_FILE + ".tmp", "w") as f:
+            json.dump(revisions, f, indent=2)
+        os.replace(REVISIONS_FILE + ".tmp", REVISIONS_FILE)
+    return sha
+
 
-def load_and_chunk():
+def iter_documents(revision=DATASET_REVISION):
+    """Yield (doc_id, text) one speech at a time, skipping exact duplicates."""
     print("📥 Loading dataset...")
-    ds = load_dataset("jsulz/state-of-the-union-addresses")
+    # A single split is a memory-mapped Arrow table, so rows are read lazily
+    ds = load_dataset(DATASET, revision=revision, split="train")
+    seen = set()
+    for row in ds:
+        text = row["speech_html"]
+        doc_id = hashlib.sha256(text.encode()).hexdigest()[:16]
+        if doc_id not in seen:
+            seen.add(doc_id)
+            yield doc_id, text
+
+
+def _init_splitter():
+    global _splitter
+    _splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, add_start_index=True
+    )
+
+
+def _split(doc):
+    doc_id, text = doc
+    chunks = _splitter.create_documents([text])
+    return [(f"{doc_id}:{c.metadata['start_index']}", c.page_content) for c in chunks]
+
+
+def iter_chunks(revision=DATASET_REVISION, workers=None):
+    """Yield (chunk_id, text) in dataset order while later speeches are still being split.
+
+    Speeches are split in a process pool with at most two per worker in flight,
+    so memory stays flat however large the corpus is.
+    """
+    workers = workers or os.cpu_count()
+    # Spawned, not forked: the caller already runs embedding and writer threads
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_splitter) as pool:
+        pending = deque()
+        for doc in iter_documents(revision):
+            pending.append(pool.submit(_split, doc))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
 
-    texts = [row["speech_html"] for row in ds["train"]]
-    docs = [Document(page_content=t) for t in texts]
 
-    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    return splitter.split_documents(docs)
+def load_and_chunk(revision=DATASET_REVISION):
+    return [
+        Document(page_content=text, metadata={"chunk_id": chunk_id})
+        for chunk_id, text in iter_chunks(revision)
+    ]
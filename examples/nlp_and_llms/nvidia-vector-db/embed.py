@@ -1,4 +1,9 @@
 from langchain_huggingface import HuggingFaceEmbeddings
 
+EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+EMBED_BATCH_SIZE = 256
+
 def get_embeddings():
-    return HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+    return HuggingFaceEmbeddings(
+        model_name=EMBED_MODEL, encode_kwargs={"batch_size": EMBED_BATCH_SIZE}
+    )
@@ -0,0 +1,101 @@
+"""
+Embed-once fan-out ingestion.
+
+One producer yields (ids, texts, vectors) batches, embedding each chunk a
+single time. Every backend gets a `BackendWriter`: its own thread and a
+bounded queue that it drains in bulk-insert chunks. All backends ingest
+concurrently. A slow backend fills its queue and blocks the producer, so
+embedded batches never pile up in memory.
+"""
+import queue
+import threading
+import time
+
+QUEUE_DEPTH = 4      # batches buffered per backend before the producer waits
+INSERT_BATCH = 1000  # rows per bulk insert call
+
+
+class BackendWriter:
+    def __init__(self, name, insert, close=None, insert_batch=INSERT_BATCH, depth=QUEUE_DEPTH):
+        self.name = name
+        # insert(ids, texts, vectors) writes one bulk chunk; close() runs once everything is in
+        self.insert = insert
+        self.close = close
+        self.insert_batch = insert_batch
+        self.queue = queue.Queue(maxsize=depth)
+        self.rows = 0
+        self.insert_seconds = 0.0
+        self.wall_seconds = 0.0
+        self.error = None
+        self._started = None
+        self._thread = threading.Thread(target=self._run, name=f"ingest-{name}", daemon=True)
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread.start()
+
+    def put(self, batch):
+        # Blocks while the queue is full: this is the back-pressure on the producer
+        self.queue.put(batch)
+
+    def finish(self):
+        self.queue.put(None)
+        self._thread.join()
+        if self.error is None and self.close is not None:
+            self.close()
+        self.wall_seconds = time.perf_counter() - self._started
+
+    def _run(self):
+        while True:
+            batch = self.queue.get()
+            if batch is None:
+                return
+            if self.error is not None:
+                continue  # keep draining so the producer never blocks on a dead writer
+            ids, texts, vectors = batch
+            try:
+                for start in range(0, len(ids), self.insert_batch):
+                    end = start + self.insert_batch
+                    t0 = time.perf_counter()
+                    self.insert(ids[start:end], texts[start:end], vectors[start:end])
+                    self.insert_seconds += time.perf_counter() - t0
+                    self.rows += len(ids[start:end])
+            except Exception as exc:
+                self.error = exc
+                print(f"⚠️ {self.name} ingestion failed: {exc}")
+
+
+def fan_out(batches, writers):
+    """Send every batch to every writer, then wait for all of them and report throughput."""
+    for writer in writers:
+        writer.start()
+    start = time.perf_counter()
+    produce_seconds = 0.0
+    rows = 0
+    try:
+        batches = iter(batches)
+        while True:
+            t0 = time.perf_counter()
+            batch = next(batches, None)
+            produce_seconds += time.perf_counter() - t0
+            if batch is None:
+                break
+            rows += len(batch[0])
+            for writer in writers:
+                writer.put(batch)
+    finally:
+        for writer in writers:
+            writer.finish()
+    elapsed = time.perf_counter() - start
+
+    print(f"\n{'stage':<12} {'rows':>9} {'busy s':>8} {'wall s':>8} {'rows/s':>10}")
+    print(f"{'produce':<12} {rows:>9} {produce_seconds:>8.1f} {elapsed:>8.1f} "
+          f"{rows / max(produce_seconds, 1e-9):>10.0f}")
+    for w in writers:
+        print(f"{w.name:<12} {w.rows:>9} {w.insert_seconds:>8.1f} {w.wall_seconds:>8.1f} "
+              f"{w.rows / max(w.insert_seconds, 1e-9):>10.0f}")
+
+    failed = [w for w in writers if w.error is not None]
+    if failed:
+        names = ", ".join(w.name for w in failed)
+        raise RuntimeError(f"Ingestion failed for {names}") from failed[0].error
@@ -1,59 +1,438 @@
+import hashlib
+import itertools
+import json
 import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
-from langchain_postgres.vectorstores import PGVector
+from langchain_core.documents import Document
+from langchain_postgres.vectorstores import DistanceStrategy, PGVector
 from langchain_milvus import Milvus
-from pymilvus import connections
-from sqlalchemy import create_engine
+from pymilvus import Collection, connections, utility
+from sqlalchemy import create_engine, text
+
+from data_loader import (
+    CHUNK_ID_SCHEME, CHUNK_OVERLAP, CHUNK_SIZE, DATASET, dataset_revision, iter_chunks
+)
+from embed import EMBED_MODEL, get_embeddings
+from ingest import BackendWriter, fan_out
+
+# Chunks, embeddings and the FAISS index are cached here, one folder per cache key
+CACHE_DIR = os.getenv("VECTOR_CACHE_DIR", ".vector_cache")
+ENCODE_BATCH = 4096   # chunks per embed_documents call while building the cache
+MILVUS_COLLECTION = "state_union_collection"
+# Passed to the Milvus store explicitly, so raw collection searches can name them
+MILVUS_TEXT_FIELD = "text"
+MILVUS_VECTOR_FIELD = "vector"
+PG_COLLECTION = "state_union_pg"
+# Tables and columns of the langchain_postgres schema, read directly by the batched search
+PG_COLLECTION_TABLE = "langchain_pg_collection"
+PG_EMBEDDING_TABLE = "langchain_pg_embedding"
+PG_TEXT_COLUMN = "document"
+PG_VECTOR_COLUMN = "embedding"
+# The raw SQL must rank with the operator matching the store's strategy (<=> is cosine)
+PG_DISTANCE = DistanceStrategy.COSINE
+PG_DISTANCE_OPERATOR = "<=>"
+
+_lock = threading.RLock()
+_embeddings = None
+_corpus = None
+_pg_engine = None
+_stores = {}
+
+
+def embeddings_model():
+    global _embeddings
+    with _lock:
+        if _embeddings is None:
+            _embeddings = get_embeddings()
+        return _embeddings
+
+
+def embedding_dims():
+    """Vector width of the embedding model, for indexes built before any vector exists."""
+    return len(embeddings_model().embed_query("dimension probe"))
+
+
+# ---------- Cached corpus ----------
+def cache_key():
+    """Hash of everything the vectors depend on; any change means re-embedding."""
+    params = {
+        "dataset": DATASET,
+        "revision": dataset_revision(),
+        "model": EMBED_MODEL,
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "chunk_ids": CHUNK_ID_SCHEME,
+    }
+    key = hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+    return key, params
+
+
+class Corpus:
+    """Chunk ids and texts plus their memory-mapped embeddings for one cache key."""
+
+    def __init__(self, key, path):
+        self.key = key
+        self.path = path
+        with open(os.path.join(path, "params.json")) as f:
+            self.params = json.load(f)
+        self.ids, self.texts = [], []
+        with open(os.path.join(path, "chunks.jsonl")) as f:
+            for line in f:
+                chunk = json.loads(line)
+                self.ids.append(chunk["id"])
+                self.texts.append(chunk["text"])
+        vectors_path = os.path.join(path, "embeddings.f32")
+        if os.path.getsize(vectors_path) == 0:
+            # An empty file can't be memory-mapped
+            self.vectors = np.zeros((0, self.params["dims"]), dtype=np.float32)
+        else:
+            self.vectors = np.memmap(vectors_path, dtype=np.float32, mode="r").reshape(
+                -1, self.params["dims"]
+            )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def batches(self, size=ENCODE_BATCH):
+        for start in range(0, len(self), size):
+            end = start + size
+            yield self.ids[start:end], self.texts[start:end], self.vectors[start:end]
+
+
+def previous_corpus(params):
+    """Newest cached corpus embedded with the same model and chunking, if any."""
+    same = ("model", "chunk_size", "chunk_overlap", "chunk_ids")
+    candidates = []
+    for key in os.listdir(CACHE_DIR) if os.path.isdir(CACHE_DIR) else []:
+        path = os.path.join(CACHE_DIR, key, "params.json")
+        if os.path.exists(path):
+            with open(path) as f:
+                old = json.load(f)
+            if all(old.get(name) == params[name] for name in same):
+                candidates.append((os.path.getmtime(path), key))
+    if not candidates:
+        return None
+    key = max(candidates)[1]
+    return Corpus(key, os.path.join(CACHE_DIR, key))
+
+
+def embed_batches(chunks, previous=None):
+    """Embed (chunk_id, text) pairs in batches as the chunker yields them.
+
+    Chunk ids are stable, so vectors already in a previous cache are reused.
+    """
+    reuse = {cid: row for row, cid in enumerate(previous.ids)} if previous else {}
+    reused = 0
+    while True:
+        batch = list(itertools.islice(chunks, ENCODE_BATCH))
+        if not batch:
+            break
+        ids, texts = [list(column) for column in zip(*batch)]
+        hits = [i for i, cid in enumerate(ids) if cid in reuse]
+        missing = [i for i, cid in enumerate(ids) if cid not in reuse]
+        if missing:
+            embedded = np.asarray(
+                embeddings_model().embed_documents([texts[i] for i in missing]), dtype=np.float32
+            )
+        dims = embedded.shape[1] if missing else previous.vectors.shape[1]
+        vectors = np.empty((len(ids), dims), dtype=np.float32)
+        if missing:
+            vectors[missing] = embedded
+        if hits:
+            vectors[hits] = previous.vectors[[reuse[ids[i]] for i in hits]]
+            reused += len(hits)
+        yield ids, texts, vectors
+    if reused:
+        print(f"♻️ Reused {reused} embeddings from cache {previous.key}")
+
+
+def faiss_writer(index_path):
+    # Same index type FAISS.from_documents builds, filled batch by batch
+    index = None
+
+    def insert(ids, texts, vectors):
+        nonlocal index
+        if index is None:
+            index = faiss.IndexFlatL2(vectors.shape[1])
+        index.add(np.ascontiguousarray(vectors))
+
+    def close():
+        # No chunks at all still leaves a valid, empty index
+        faiss.write_index(index or faiss.IndexFlatL2(embedding_dims()), index_path)
+
+    return BackendWriter("faiss", insert, close=close, insert_batch=ENCODE_BATCH)
+
+
+def store_writer(name, store, close=None):
+    """Writer that inserts precomputed vectors; the remote stores never call the embedder."""
+    def insert(ids, texts, vectors):
+        store.add_embeddings(texts=texts, embeddings=vectors.tolist(), ids=ids)
+
+    return BackendWriter(name, insert, close=close)
+
+
+def build_corpus(params, path, chunks):
+    """Embed the chunks once, streaming them into the cache files and the FAISS index.
+
+    Remote backends are filled afterwards from the finished cache, so a failing
+    server never throws away the embedding pass.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    previous = previous_corpus(params)
+    meta = dict(params)
+    tmp = tempfile.mkdtemp(dir=CACHE_DIR)
+    try:
+        print("🔢 Chunking and embedding...")
+        with open(os.path.join(tmp, "chunks.jsonl"), "w") as chunk_file, \
+                open(os.path.join(tmp, "embeddings.f32"), "wb") as vector_file:
 
+            def saved(batches):
+                # The cache files grow batch by batch and are never held in memory whole
+                for ids, texts, vectors in batches:
+                    for cid, chunk in zip(ids, texts):
+                        chunk_file.write(json.dumps({"id": cid, "text": chunk}) + "\n")
+                    vector_file.write(vectors.tobytes())
+                    meta["dims"] = vectors.shape[1]
+                    yield ids, texts, vectors
 
-from data_loader import load_and_chunk
-from embed import get_embeddings
+            batches = saved(embed_batches(chunks, previous))
+            fan_out(batches, [faiss_writer(os.path.join(tmp, "faiss.index"))])
+
+        if "dims" not in meta:
+            meta["dims"] = embedding_dims()  # the dataset produced no chunks
+        with open(os.path.join(tmp, "params.json"), "w") as f:
+            json.dump(meta, f, indent=2)
+        # Only a complete folder ever appears under the final name
+        os.replace(tmp, path)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
 
-# Load data + embeddings
-docs = load_and_chunk()
-embeddings = get_embeddings()
 
 # ---------- FAISS ----------
-print("🚀 Loading FAISS...")
-faiss_db = FAISS.from_documents(docs, embeddings)
+def load_faiss(corpus):
+    path = os.path.join(corpus.path, "faiss.index")
+    try:
+        index = faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        # Older FAISS builds can't memory-map flat indexes
+        index = faiss.read_index(path)
+    docstore = InMemoryDocstore(
+        {cid: Document(page_content=t) for cid, t in zip(corpus.ids, corpus.texts)}
+    )
+    return FAISS(
+        embedding_function=embeddings_model(),
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=dict(enumerate(corpus.ids)),
+    )
+
 
 # ---------- Milvus (Zilliz) ----------
-print("🚀 Connecting to Zilliz Cloud...")
-connections.connect(
-    alias="default",
-    uri=os.getenv("ZILLIZ_URI"),
-    token=os.getenv("ZILLIZ_TOKEN")
-)
-milvus_db = Milvus.from_documents(
-    docs,
-    embeddings,
-    collection_name="state_union_collection",
-    connection_args={"alias": "default"},
-)
+def open_milvus(key, n_rows):
+    """Returns the store and, if it needs (re)filling, a writer for it."""
+    print("🚀 Connecting to Zilliz Cloud...")
+    connections.connect(
+        alias="default",
+        uri=os.getenv("ZILLIZ_URI"),
+        token=os.getenv("ZILLIZ_TOKEN")
+    )
+    # The cache key is part of the name, so a collection for the current key is reusable
+    name = f"{MILVUS_COLLECTION}_{key}"
+    # Only collections this code created for older cache keys, never other users' collections
+    generated = re.compile(rf"{re.escape(MILVUS_COLLECTION)}_[0-9a-f]{{16}}")
+    for old in utility.list_collections():
+        if generated.fullmatch(old) and old != name:
+            utility.drop_collection(old)
+
+    complete = utility.has_collection(name) and Collection(name).num_entities == n_rows
+    store = Milvus(
+        embeddings_model(),
+        collection_name=name,
+        connection_args={"alias": "default"},
+        text_field=MILVUS_TEXT_FIELD,
+        vector_field=MILVUS_VECTOR_FIELD,
+        drop_old=not complete,
+    )
+    if complete:
+        print(f"♻️ Reusing Milvus collection {name}")
+        return store, None
+    return store, store_writer("milvus", store, close=lambda: Collection(name).flush())
+
 
 # ---------- PGVector ----------
-print("🚀 Connecting to PGVector...")
-NEON_CONN = os.getenv("PG_CONNECTION")  # must contain full neon URL
-print("🚀 Connecting to Neon PGVector...")
-engine = create_engine(NEON_CONN)
-
-pg_db = PGVector.from_documents(
-    docs,
-    embeddings,
-    connection=engine,
-    collection_name="state_union_pg"
-)
+def open_pgvector(key, n_rows):
+    """Returns the store and, if it needs (re)filling, a writer for it."""
+    global _pg_engine
+    NEON_CONN = os.getenv("PG_CONNECTION")  # must contain full neon URL
+    print("🚀 Connecting to Neon PGVector...")
+    engine = _pg_engine = create_engine(NEON_CONN)
+
+    name = f"{PG_COLLECTION}_{key}"
+    store = PGVector(
+        embeddings_model(), connection=engine, collection_name=name, distance_strategy=PG_DISTANCE
+    )
+    with engine.begin() as conn:
+        # Embeddings of deleted collections go with them (ON DELETE CASCADE)
+        # Only collections named <prefix>_<16-hex cache key>, as generated here
+        conn.execute(
+            text(f"DELETE FROM {PG_COLLECTION_TABLE} WHERE name ~ :pattern AND name != :name"),
+            {"pattern": f"^{re.escape(PG_COLLECTION)}_[0-9a-f]{{16}}$", "name": name},
+        )
+        count = conn.execute(
+            text(
+                f"SELECT count(*) FROM {PG_EMBEDDING_TABLE} e "
+                f"JOIN {PG_COLLECTION_TABLE} c ON e.collection_id = c.uuid WHERE c.name = :name"
+            ),
+            {"name": name},
+        ).scalar()
+
+    if count == n_rows:
+        print(f"♻️ Reusing PGVector collection {name}")
+        return store, None
+    store.delete_collection()
+    store.create_collection()
+    return store, store_writer("pgvector", store)
+
+
+REMOTE = {"milvus": open_milvus, "pgvector": open_pgvector}
+BACKENDS = ["faiss"] + list(REMOTE)
+
+
+def load_stores(dbs):
+    """Load backends that aren't loaded yet, embedding the corpus at most once."""
+    global _corpus
+    with _lock:
+        dbs = [db for db in dbs if db not in _stores]
+        if not dbs:
+            return
+        start = time.perf_counter()
+        key, params = cache_key()
+        path = os.path.join(CACHE_DIR, key)
+        corpus = Corpus(key, path) if os.path.exists(path) else None
+
+        # The local cache is built and persisted before any remote backend is contacted
+        if corpus is None:
+            # Embedding starts with the first chunks while the pool splits the rest
+            build_corpus(params, path, iter_chunks(params["revision"]))
+            corpus = Corpus(key, path)
+        print(f"📦 Corpus {key}: {len(corpus)} chunks")
+        _corpus = corpus
+        if "faiss" in dbs:
+            _stores["faiss"] = load_faiss(corpus)
+
+        # Every remote backend that needs data is fed from the same pass over the cache
+        stores, writers = {}, []
+        for db in dbs:
+            if db in REMOTE:
+                stores[db], writer = REMOTE[db](key, len(corpus))
+                if writer is not None:
+                    writers.append(writer)
+        if writers:
+            print(f"📤 Uploading {len(corpus)} cached vectors to {len(writers)} backend(s)...")
+            fan_out(corpus.batches(), writers)
+        _stores.update(stores)
+        print(f"✅ {', '.join(dbs)} ready in {time.perf_counter() - start:.1f}s")
+
 
-print("✅ PGVector (Neon) loaded!")
+def get_corpus():
+    """The cached chunks and vectors behind the stores (builds the cache if needed)."""
+    if _corpus is None:
+        load_stores(["faiss"])
+    return _corpus
+
+
+def get_store(db: str):
+    """Build (or reuse) a backend on first use instead of at import."""
+    if db not in _stores:
+        load_stores([db])
+    return _stores[db]
 
-print("✅ All vector DBs ready!")
 
 # Generic search method
 def search(db: str, query: str, k: int = 3):
-    if db == "faiss":
-        return faiss_db.similarity_search(query, k)
-    if db == "milvus":
-        return milvus_db.similarity_search(query, k)
-    if db == "pgvector":
-        return pg_db.similarity_search(query, k)
-    return []
+    if db not in BACKENDS:
+        return []
+    return get_store(db).similarity_search(query, k)
+
+
+# ---------- Batched search: one embedding pass, one multi-vector search per backend ----------
+def faiss_search_batch(store, vectors, k):
+    _, rows = store.index.search(vectors, k)
+    return [
+        [store.docstore.search(store.index_to_docstore_id[r]) for r in row if r != -1]
+        for row in rows
+    ]
+
+
+def milvus_search_batch(store, vectors, k):
+    hits = Collection(store.collection_name).search(
+        data=vectors.tolist(),
+        anns_field=MILVUS_VECTOR_FIELD,
+        param={"metric_type": "L2"},
+        limit=k,
+        output_fields=[MILVUS_TEXT_FIELD],
+    )
+    return [
+        [Document(page_content=hit.entity.get(MILVUS_TEXT_FIELD)) for hit in row] for row in hits
+    ]
+
+
+PG_BATCH_SQL = text(f"""
+    SELECT q.i, e.{PG_TEXT_COLUMN}
+    FROM unnest(CAST(:idx AS int[]), CAST(:vecs AS text[])) AS q(i, v)
+    CROSS JOIN LATERAL (
+        SELECT {PG_TEXT_COLUMN},
+               {PG_VECTOR_COLUMN} {PG_DISTANCE_OPERATOR} CAST(q.v AS vector) AS distance
+        FROM {PG_EMBEDDING_TABLE}
+        WHERE collection_id = (SELECT uuid FROM {PG_COLLECTION_TABLE} WHERE name = :name)
+        ORDER BY distance
+        LIMIT :k
+    ) e
+    ORDER BY q.i, e.distance
+""")
+
+
+def pgvector_search_batch(store, vectors, k):
+    # All queries in one round trip: a LATERAL join runs the k-NN search per query vector
+    vecs = ["[" + ",".join(f"{x:.7g}" for x in v) + "]" for v in vectors]
+    results = [[] for _ in vecs]
+    with _pg_engine.connect() as conn:
+        rows = conn.execute(
+            PG_BATCH_SQL,
+            {"idx": list(range(len(vecs))), "vecs": vecs, "name": store.collection_name, "k": k},
+        )
+        for i, document in rows:
+            results[i].append(Document(page_content=document))
+    return results
+
+
+SEARCH_BATCH = {
+    "faiss": faiss_search_batch,
+    "milvus": milvus_search_batch,
+    "pgvector": pgvector_search_batch,
+}
+
+
+def search_batch(db: str, queries: list, k: int = 3):
+    """Search many queries at once; returns one list of documents per query."""
+    if db not in BACKENDS or not queries:
+        return [[] for _ in queries]
+    store = get_store(db)
+    vectors = np.asarray(embeddings_model().embed_documents(queries), dtype=np.float32)
+    return SEARCH_BATCH[db](store, vectors, k)
+
+
+if __name__ == "__main__":
+    # Warm the cache and the remote stores in one pass: python vectordb.py [faiss milvus pgvector]
+    load_stores(sys.argv[1:] or BACKENDS)
+    print("✅ All vector DBs ready!")
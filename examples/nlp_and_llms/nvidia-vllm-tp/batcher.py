@@ -0,0 +1,163 @@
+"""
+Drives the engine step by step without blocking the event loop.
+
+Requests wait in a queue. When the engine is idle, a collector task takes the
+first one and waits up to `max_wait_ms` for more, so simultaneous arrivals
+are prefilled together. While requests are running, new ones join between
+decode steps, up to `max_batch_size` in flight. Each step runs on a worker
+thread. Its outputs go to per-request queues, so callers can stream tokens
+or await the final completion on their own.
+"""
+import asyncio
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+_END = object()
+
+
+class _Handle:
+    def __init__(self, request):
+        self.request = request
+        self.outputs = asyncio.Queue()
+        self.cancelled = False
+
+
+class RequestBatcher:
+    def __init__(self, engine, max_batch_size=32, max_wait_ms=10):
+        self.engine = engine
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        # One thread: the engine owns the GPUs and isn't safe to call concurrently
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="engine")
+        self.queue = None
+        self.active = {}
+        self._ids = itertools.count()
+        self._task = None
+        self.steps = 0
+        self.step_requests = 0
+        self.requests = 0
+
+    def start(self):
+        if self._task is None:
+            self.queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.executor.shutdown(wait=False)
+
+    async def stream(self, request):
+        """Yields the cumulative Completion after every decode step; the last one is final."""
+        self.start()
+        handle = _Handle(request)
+        await self.queue.put(handle)
+        try:
+            while True:
+                item = await handle.outputs.get()
+                if item is _END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Also reached when the client disconnects: stop generating for it
+            handle.cancelled = True
+
+    async def submit(self, request):
+        """Returns the final completion for one request."""
+        completion = None
+        async for completion in self.stream(request):
+            pass
+        return completion
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "active": len(self.active),
+            "queued": self.queue.qsize() if self.queue else 0,
+            "decode_steps": self.steps,
+            "avg_batch_size": round(self.step_requests / self.steps, 2) if self.steps else 0.0,
+        }
+
+    async def _admit(self):
+        """New requests to add before the next step."""
+        loop = asyncio.get_running_loop()
+        admitted = []
+        if not self.active:
+            admitted.append(await self.queue.get())
+            deadline = loop.time() + self.max_wait
+        while len(self.active) + len(admitted) < self.max_batch_size:
+            try:
+                admitted.append(self.queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            # Only an idle engine waits for company; a busy one keeps decoding
+            timeout = deadline - loop.time() if not self.active else 0
+            if timeout <= 0:
+                break
+            try:
+                admitted.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return {str(next(self._ids)): h for h in admitted if not h.cancelled}
+
+    def _advance(self, admitted, aborted):
+        """Adds the admitted requests and runs one step: (outputs, {request_id: error})."""
+        if aborted:
+            self.engine.abort(aborted)
+        # A request the engine rejects (bad sampling params, prompt too long) fails alone
+        rejected = {}
+        for request_id, handle in admitted.items():
+            try:
+                self.engine.add_request(request_id, handle.request)
+            except Exception as exc:
+                rejected[request_id] = exc
+        if len(rejected) == len(self.active):
+            return None, rejected  # nothing left to step
+        return self.engine.step(), rejected
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            admitted = await self._admit()
+            aborted = [rid for rid, h in self.active.items() if h.cancelled]
+            for request_id in aborted:
+                del self.active[request_id]
+            self.active.update(admitted)
+            self.requests += len(admitted)
+            if not self.active:
+                if aborted:
+                    await loop.run_in_executor(self.executor, self.engine.abort, aborted)
+                continue
+            try:
+                outputs, rejected = await loop.run_in_executor(
+                    self.executor, self._advance, admitted, aborted
+                )
+            except Exception as exc:
+                for handle in self.active.values():
+                    handle.outputs.put_nowait(exc)
+                try:
+                    await loop.run_in_executor(
+                        self.executor, self.engine.abort, list(self.active)
+                    )
+                except Exception:
+                    pass  # the step's error has already been reported to every caller
+                self.active = {}
+                continue
+            for request_id, exc in rejected.items():
+                self.active.pop(request_id).outputs.put_nowait(exc)
+            if outputs is None:
+                continue
+            self.steps += 1
+            self.step_requests += len(self.active)
+            for request_id, completion, finished in outputs:
+                handle = self.active.get(request_id)
+                if handle is None:
+                    continue
+                handle.outputs.put_nowait(completion)
+                if finished:
+                    handle.outputs.put_nowait(_END)
+                    del self.active[request_id]
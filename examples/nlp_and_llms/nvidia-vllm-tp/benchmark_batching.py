@@ -0,0 +1,59 @@
+"""
+Throughput and latency of the request batcher with the CPU fake engine.
+
+    python benchmark_batching.py --clients 1 8 32 --max-tokens 64
+
+Each concurrency level runs twice: with max_batch_size=1 (one request on the
+engine at a time) and with batching. No GPU or model is needed.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from batcher import RequestBatcher
+from engines import FakeEngine, GenerationRequest
+
+
+async def run(batcher, clients, requests, max_tokens):
+    async def one(i):
+        # Mixed lengths: every request gets its own max_tokens and temperature
+        request = GenerationRequest(
+            prompt=f"request {i} explain tensor parallelism",
+            max_tokens=random.randint(max_tokens // 2, max_tokens),
+            temperature=random.choice([0.0, 0.7]),
+        )
+        start = time.perf_counter()
+        completion = await batcher.submit(request)
+        assert completion.completion_tokens == request.max_tokens
+        return time.perf_counter() - start
+
+    semaphore = asyncio.Semaphore(clients)
+
+    async def limited(i):
+        async with semaphore:
+            return await one(i)
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(limited(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    await batcher.stop()
+    return requests / elapsed, statistics.median(latencies) * 1000, batcher.stats()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Request batcher benchmark (fake engine)")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--max-tokens", type=int, default=64)
+    parser.add_argument("--token-latency", type=float, default=0.01)
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    engine = FakeEngine(token_latency=args.token_latency)
+    print(f"{'mode':<9} {'clients':>7} {'req/s':>8} {'p50 ms':>9} {'avg batch':>10}")
+    for clients in args.clients:
+        for name, size in [("single", 1), ("batched", args.max_batch_size)]:
+            batcher = RequestBatcher(engine, max_batch_size=size)
+            rate, p50, stats = asyncio.run(run(batcher, clients, 4 * clients, args.max_tokens))
+            print(f"{name:<9} {clients:>7} {rate:>8.1f} {p50:>9.1f} {stats['avg_batch_size']:>10}")
@@ -0,0 +1,132 @@
+"""
+Generation engines behind start_server.py.
+
+An engine is driven one decode step at a time by a single thread (see
+batcher.py). Requests are added with `add_request`, and each `step()`
+advances every unfinished request by one token. `step()` returns one
+`(request_id, Completion, finished)` per request, where the completion holds
+the cumulative text so far.
+
+* `VLLMEngine`: the `LLMEngine` inside vLLM's offline `LLM`, with tensor
+  parallelism. Each request keeps its own SamplingParams. Chat prompts are
+  tokenized by the chat template and submitted as token ids, as vLLM's own
+  OpenAI server does, so special tokens such as BOS aren't added twice.
+* `FakeEngine`: simulates per-token latency on CPU, for testing the batching
+  and the API without GPUs.
+"""
+import time
+from dataclasses import dataclass
+
+
+@dataclass
+class GenerationRequest:
+    prompt: str | list[int]  # text, or token ids already rendered by the chat template
+    max_tokens: int = 512
+    temperature: float = 0.7
+    top_p: float = 0.9
+
+
+@dataclass
+class Completion:
+    text: str
+    prompt_tokens: int
+    completion_tokens: int
+    finish_reason: str = None
+
+
+class VLLMEngine:
+    def __init__(self, model_id, tensor_parallel_size):
+        from vllm import LLM, SamplingParams
+        from vllm.inputs import TokensPrompt
+
+        self._sampling_params = SamplingParams
+        self._tokens_prompt = TokensPrompt
+        self.llm = LLM(
+            model=model_id,
+            tensor_parallel_size=tensor_parallel_size,
+            gpu_memory_utilization=0.95, # High utilization as recommended
+            dtype="bfloat16",             # Use bfloat16 for Ampere GPUs (A40/3090/etc)
+            enforce_eager=True,           # Fixes AsyncEngineDead issues
+            max_model_len=8128,           # Matches the context length in the guide
+        )
+        self.engine = self.llm.llm_engine
+        self.tokenizer = self.llm.get_tokenizer()
+
+    def apply_chat_template(self, messages):
+        # Token ids, not text: re-tokenizing the rendered text would prepend a second BOS
+        return self.tokenizer.apply_chat_template(
+            messages, tokenize=True, add_generation_prompt=True
+        )
+
+    def add_request(self, request_id, request):
+        params = self._sampling_params(
+            temperature=request.temperature, top_p=request.top_p, max_tokens=request.max_tokens
+        )
+        prompt = request.prompt
+        if not isinstance(prompt, str):
+            prompt = self._tokens_prompt(prompt_token_ids=list(prompt))
+        self.engine.add_request(request_id, prompt, params)
+
+    def abort(self, request_ids):
+        self.engine.abort_request(request_ids)
+
+    def step(self):
+        # vLLM schedules every unfinished request into this step (continuous batching)
+        return [
+            (
+                out.request_id,
+                Completion(
+                    text=out.outputs[0].text,
+                    prompt_tokens=len(out.prompt_token_ids),
+                    completion_tokens=len(out.outputs[0].token_ids),
+                    finish_reason=out.outputs[0].finish_reason,
+                ),
+                out.finished,
+            )
+            for out in self.engine.step()
+        ]
+
+
+class FakeEngine:
+    """Echoes the prompt, one word per step.
+
+    Like a real batched engine, a step costs token_latency whatever the batch
+    size. A step that admits new requests also pays prefill_latency.
+    """
+
+    def __init__(self, token_latency=0.02, prefill_latency=0.05):
+        self.token_latency = token_latency
+        self.prefill_latency = prefill_latency
+        self.active = {}
+        self.new = False
+
+    def apply_chat_template(self, messages):
+        turns = "".join(f"<|{m['role']}|>\n{m['content']}\n" for m in messages)
+        return f"{turns}<|assistant|>\n"
+
+    def add_request(self, request_id, request):
+        words = request.prompt.split() or ["..."]
+        self.active[request_id] = (request, words, [])
+        self.new = True
+
+    def abort(self, request_ids):
+        for request_id in request_ids:
+            self.active.pop(request_id, None)
+
+    def step(self):
+        time.sleep(self.token_latency + (self.prefill_latency if self.new else 0))
+        self.new = False
+        outputs = []
+        for request_id, (request, words, generated) in list(self.active.items()):
+            generated.append(words[len(generated) % len(words)])
+            finished = len(generated) >= max(1, request.max_tokens)
+            completion = Completion(
+                text=" ".join(generated),
+                prompt_tokens=len(words),
+                completion_tokens=len(generated),
+                finish_reason="length" if finished else None,
+            )
+            outputs.append((request_id, completion, finished))
+            if finished:
+                del self.active[request_id]
+        return outputs
@@ -1,8 +1,14 @@
-from vllm import LLM, SamplingParams
 from fastapi import FastAPI
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 import uvicorn
+import json
 import os
+import time
+import uuid
+
+from batcher import RequestBatcher
+from engines import FakeEngine, GenerationRequest, VLLMEngine
 
 # -----------------------------
 # ⚙️ Model Setup
@@ -13,24 +19,24 @@ MODEL_ID = "meta-llama/Meta-Llama-3-70B-Instruct"
 # ---- Tensor Parallelism ----
 TENSOR_PARALLEL = 4
 
+# ---- Batching ----
+# ENGINE=fake serves a CPU-only stand-in that simulates per-token latency
+ENGINE = os.getenv("ENGINE", "vllm")
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "32"))
+MAX_WAIT_MS = float(os.getenv("MAX_WAIT_MS", "10"))
+
 # -----------------------------
 # 🚀 Initialize vLLM
 # -----------------------------
-print(f"🔄 Loading model {MODEL_ID} using vLLM tensor parallelism...")
-llm = LLM(
-    model=MODEL_ID,
-    tensor_parallel_size=TENSOR_PARALLEL,
-    gpu_memory_utilization=0.95, # High utilization as recommended
-    dtype="bfloat16",             # Use bfloat16 for Ampere GPUs (A40/3090/etc)
-    enforce_eager=True,           # Fixes AsyncEngineDead issues
-    max_model_len=8128,           # Matches the context length in the guide
-)
-
-sampling = SamplingParams(
-    temperature=0.7,
-    top_p=0.9,
-    max_tokens=512
-)
+if ENGINE == "fake":
+    print("🧪 Using the fake engine (no model loaded)")
+    engine = FakeEngine(token_latency=float(os.getenv("FAKE_TOKEN_LATENCY", "0.02")))
+else:
+    print(f"🔄 Loading model {MODEL_ID} using vLLM tensor parallelism...")
+    engine = VLLMEngine(MODEL_ID, TENSOR_PARALLEL)
+
+# Requests join the running batch between decode steps instead of blocking the event loop
+batcher = RequestBatcher(engine, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS)
 
 # -----------------------------
 # 🌐 FastAPI (OpenAI-style API)
@@ -38,30 +44,118 @@ sampling = SamplingParams(
 app = FastAPI(title="vLLM Tensor Parallel Server")
 
 
+class Message(BaseModel):
+    role: str
+    content: str
+
+
+class StreamOptions(BaseModel):
+    include_usage: bool = False
+
+
 class ChatRequest(BaseModel):
     model: str
-    messages: list
+    messages: list[Message]
+    # Out-of-range sampling params get a 422 here instead of an engine error
+    max_tokens: int = Field(512, ge=1)
+    temperature: float = Field(0.7, ge=0)
+    top_p: float = Field(0.9, gt=0, le=1)
+    stream: bool = False
+    stream_options: StreamOptions | None = None
+
+
+def usage(completion):
+    return {
+        "prompt_tokens": completion.prompt_tokens,
+        "completion_tokens": completion.completion_tokens,
+        "total_tokens": completion.prompt_tokens + completion.completion_tokens,
+    }
 
 
+def sse(payload):
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+async def stream_chat(req, request, completion_id, created):
+    def chunk(delta, finish_reason=None):
+        return {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": req.model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+
+    yield sse(chunk({"role": "assistant", "content": ""}))
+    sent, completion = 0, None
+    try:
+        async for completion in batcher.stream(request):
+            # Completions are cumulative; send only the new text
+            delta = completion.text[sent:]
+            sent = len(completion.text)
+            if delta:
+                yield sse(chunk({"content": delta}))
+    except Exception as exc:
+        # Headers are already sent, so report the failure in-band
+        yield sse({"error": {"message": f"{type(exc).__name__}: {exc}"}})
+        yield "data: [DONE]\n\n"
+        return
+    yield sse(chunk({}, completion.finish_reason or "stop"))
+    if req.stream_options and req.stream_options.include_usage:
+        yield sse({**chunk({}), "choices": [], "usage": usage(completion)})
+    yield "data: [DONE]\n\n"
+
+
+@app.on_event("startup")
+async def start_batcher():
+    batcher.start()
+
+
+@app.on_event("shutdown")
+async def stop_batcher():
+    await batcher.stop()
+
 
 @app.post("/v1/chat/completions")
 async def chat(req: ChatRequest):
-    user_msg = req.messages[-1]["content"]
+    # The model's own chat template over the whole conversation, not just the last message
+    prompt = engine.apply_chat_template([m.model_dump() for m in req.messages])
+    request = GenerationRequest(
+        prompt=prompt,
+        max_tokens=req.max_tokens,
+        temperature=req.temperature,
+        top_p=req.top_p,
+    )
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
 
-    outputs = llm.generate([user_msg], sampling)
-    # Access the first element of the list before accessing attributes
-    text = outputs[0].outputs[0].text 
+    if req.stream:
+        return StreamingResponse(
+            stream_chat(req, request, completion_id, created), media_type="text/event-stream"
+        )
 
+    completion = await batcher.submit(request)
     return {
-        "id": "tensorpar-chat",
+        "id": completion_id,
         "object": "chat.completion",
+        "created": created,
         "model": req.model,
         "choices": [
-            {"index": 0, "message": {"role": "assistant", "content": text}}
-        ]
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": completion.text},
+                "finish_reason": completion.finish_reason or "stop",
+            }
+        ],
+        "usage": usage(completion),
     }
 
 
+@app.get("/stats")
+def stats():
+    return batcher.stats()
+
+
 # -----------------------------
 # ▶️ Run the Server
 # -----------------------------
@@ -1,24 +1,63 @@
+import argparse
 import requests
 import json # Import json module
+import time
+
+parser = argparse.ArgumentParser(description="Test the vLLM server")
+parser.add_argument("--stream", action="store_true",
+                    help="Stream tokens and report time to first token")
+args = parser.parse_args()
 
 payload = {
-    
-    "model": "meta-llama/Meta-Llama-3-70B-Instruct", 
+
+    "model": "meta-llama/Meta-Llama-3-70B-Instruct",
     "messages": [
+        {"role": "system", "content": "You are a concise technical assistant."},
         {"role": "user", "content": "Explain tensor parallelism simply."}
-    ]
+    ],
+    "max_tokens": 256,
 }
 
 # Use the correct internal address
-url = "http://127.0.0.1:8000/v1/chat/completions" 
+url = "http://127.0.0.1:8000/v1/chat/completions"
 
-res = requests.post(url, json=payload)
-
-# Check if the request was successful before parsing JSON
-if res.status_code == 200:
-    data = res.json()
-    print("RAW:", json.dumps(data, indent=2))
-    print("\nASSISTANT:", data["choices"][0]["message"]["content"])
+if args.stream:
+    payload["stream"] = True
+    payload["stream_options"] = {"include_usage": True}
+    start = time.perf_counter()
+    first_token = None
+    usage = None
+    print("ASSISTANT: ", end="", flush=True)
+    with requests.post(url, json=payload, stream=True) as res:
+        res.raise_for_status()
+        for line in res.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data: "):
+                continue
+            data = line[len("data: "):]
+            if data == "[DONE]":
+                break
+            chunk = json.loads(data)
+            if "error" in chunk:
+                raise RuntimeError(chunk["error"]["message"])
+            if chunk.get("usage"):
+                usage = chunk["usage"]
+            for choice in chunk["choices"]:
+                content = choice["delta"].get("content")
+                if content:
+                    first_token = first_token or time.perf_counter() - start
+                    print(content, end="", flush=True)
+    total = time.perf_counter() - start
+    if first_token is not None:
+        print(f"\n\nTime to first token: {first_token * 1000:.0f} ms, total: {total:.2f} s")
+    print("Usage:", usage)
 else:
-    print(f"Request failed with status code {res.status_code}")
-    print("Response text:", res.text)
+    res = requests.post(url, json=payload)
+
+    # Check if the request was successful before parsing JSON
+    if res.status_code == 200:
+        data = res.json()
+        print("RAW:", json.dumps(data, indent=2))
+        print("\nASSISTANT:", data["choices"][0]["message"]["content"])
+    else:
+        print(f"Request failed with status code {res.status_code}")
+        print("Response text:", res.text)